@@ -1,13 +1,29 @@
+import io
+import math
 import os
 import secrets
-from flask import Flask, jsonify, request, Response
+import time
+import numpy as np
+from flask import Flask, jsonify, request, Response, g, stream_with_context
 from flask_cors import CORS
-import requests
 from prometheus_flask_exporter import PrometheusMetrics
 from dotenv import load_dotenv
 from flask_wtf.csrf import CSRFProtect
-from urllib.parse import quote
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST, Histogram
+from rate_cache import RateCache, RedisRateCache, expires_at_for
+from cross_rates import CrossRates, BODY_ENCODINGS
+from single_flight import SingleFlight, SingleFlightTimeout
+from refresher import RateRefresher
+from upstream import UpstreamClient, UpstreamError
+from circuit_breaker import CircuitBreaker, CircuitOpenError, STATE_VALUES
+from shared_snapshot import SharedRateSnapshot
+from snapshot_archive import RateArchive
+from rate_snapshot import SnapshotRef, table_version
+from rate_stream import RateBroadcaster
+from wire_formats import FORMATS, JSON, FORMAT_TAGS, rates_body, matrix_body, batch_body
+from bulk_convert import BulkConverter
+from fixed_point import format_minor
+from currencies import is_known, unknown_codes
 
 # Load environment variables from .env file
 load_dotenv()
@@ -58,6 +74,105 @@ EXCHANGE_API_KEY = os.getenv("EXCHANGE_API_KEY")
 if EXCHANGE_API_KEY is None:
     print("⚠️ WARNING: EXCHANGE_API_KEY environment variable is not set. API will not work without it.")
 
+# Fail fast instead of tying up workers while the provider is down
+upstream_circuit_state = metrics.info(
+    'currency_converter_upstream_circuit_state',
+    'Upstream circuit breaker state (0=closed, 1=half-open, 2=open)'
+)
+upstream_circuit_state.set(STATE_VALUES['closed'])
+upstream_circuit_failures = metrics.info(
+    'currency_converter_upstream_circuit_failures',
+    'Consecutive upstream failures seen by the circuit breaker'
+)
+upstream_circuit_failures.set(0)
+
+def on_circuit_change(state, failures):
+    upstream_circuit_state.set(STATE_VALUES[state])
+    upstream_circuit_failures.set(failures)
+
+upstream_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv('UPSTREAM_FAILURE_THRESHOLD', '5')),
+    reset_timeout=float(os.getenv('UPSTREAM_RESET_TIMEOUT', '30')),
+    on_change=on_circuit_change
+)
+
+# One keep-alive connection pool per worker for every upstream call
+upstream = UpstreamClient(
+    EXCHANGE_API_KEY,
+    base_url=os.getenv('EXCHANGE_API_URL', 'https://v6.exchangerate-api.com/v6'),
+    connect_timeout=float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', '3.05')),
+    read_timeout=float(os.getenv('UPSTREAM_READ_TIMEOUT', '5')),
+    pool_size=int(os.getenv('UPSTREAM_POOL_SIZE', '10')),
+    breaker=upstream_breaker
+)
+
+# Rate tables change at most hourly upstream: fetch a single pivot table,
+# keep it in memory and derive every other base from it
+RATES_PIVOT = os.getenv('RATES_PIVOT', 'USD')
+RATES_CACHE_TTL = int(os.getenv('RATES_CACHE_TTL', '3600'))
+RATES_CACHE_MAX_ENTRIES = int(os.getenv('RATES_CACHE_MAX_ENTRIES', '64'))
+# Expired tables keep being served for this long while a refresh runs in the background
+RATES_MAX_STALENESS = int(os.getenv('RATES_MAX_STALENESS', '3600'))
+# 'memory' (per process) or 'redis' (shared by every replica behind the load balancer)
+RATES_CACHE_BACKEND = os.getenv('RATES_CACHE_BACKEND', 'memory')
+
+def create_rate_cache():
+    """Build the rate table cache selected by RATES_CACHE_BACKEND"""
+    if RATES_CACHE_BACKEND == 'redis':
+        import redis
+        return RedisRateCache(
+            redis.Redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/0')),
+            encode=CrossRates.to_bytes,
+            decode=CrossRates.from_bytes,
+            default_ttl=RATES_CACHE_TTL,
+            max_stale=RATES_MAX_STALENESS
+        )
+    if RATES_CACHE_BACKEND != 'memory':
+        raise ValueError(f"Unknown RATES_CACHE_BACKEND: {RATES_CACHE_BACKEND}")
+    return RateCache(
+        max_entries=RATES_CACHE_MAX_ENTRIES,
+        default_ttl=RATES_CACHE_TTL,
+        max_stale=RATES_MAX_STALENESS
+    )
+
+rate_cache = create_rate_cache()
+
+# Workers on the same host share one memory-mapped pivot table: only the
+# worker holding the refresh lock calls the upstream, the others map its file
+RATES_SHARED_PATH = os.getenv('RATES_SHARED_PATH')
+shared_rates = SharedRateSnapshot(RATES_SHARED_PATH) if RATES_SHARED_PATH else None
+
+# Every fetched table is archived to MongoDB in the background: history
+# queries and warm starts then cost no upstream call
+MONGO_URL = os.getenv('MONGO_URL')
+
+def create_rate_archive():
+    """Connect the snapshot archive when MONGO_URL is set"""
+    if not MONGO_URL:
+        return None
+    from pymongo import MongoClient
+    client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=2000)
+    archive = RateArchive(client[os.getenv('MONGO_DB', 'currency_converter')]['rate_snapshots'])
+    try:
+        archive.ensure_indexes()
+    except Exception as e:
+        print(f"⚠️ WARNING: Could not create rate snapshot indexes: {e}")
+    return archive
+
+rate_archive = create_rate_archive()
+
+# Concurrent misses on the same table share one upstream fetch
+UPSTREAM_WAIT_TIMEOUT = float(os.getenv('UPSTREAM_WAIT_TIMEOUT', '10'))
+upstream_fetch_served = Histogram(
+    'currency_converter_upstream_fetch_served',
+    'Requests served by a single upstream rate table fetch',
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250)
+)
+upstream_flight = SingleFlight(
+    wait_timeout=UPSTREAM_WAIT_TIMEOUT,
+    on_flight=lambda key, served: upstream_fetch_served.observe(served)
+)
+
 # Configure CORS with security settings
 cors_origin = os.getenv('CORS_ORIGIN', '*')
 
@@ -88,6 +203,13 @@ def health():
             "health": "/health",
             "metrics": "/metrics"
         },
+        "cache": rate_cache.stats(),
+        "upstream": dict(upstream_flight.stats(), http=upstream.stats(), circuit=upstream_breaker.stats()),
+        "refresher": rate_refresher.stats(),
+        "snapshot": rate_snapshot.stats(),
+        "stream": rate_broadcaster.stats(),
+        "shared": shared_rates.stats() if shared_rates is not None else None,
+        "archive": rate_archive.stats() if rate_archive is not None else None,
         "security": {
             "csrf_enabled": app.config['WTF_CSRF_ENABLED'],
             "environment": os.getenv('FLASK_ENV', 'development'),
@@ -96,6 +218,209 @@ def health():
         
     }), 200
 
+# Current immutable rate snapshot; also the last known good table once expired.
+# The most recent ones are kept for /rates/delta
+RATES_DELTA_HISTORY = int(os.getenv('RATES_DELTA_HISTORY', '32'))
+rate_snapshot = SnapshotRef(history=RATES_DELTA_HISTORY)
+
+def publish_cross_rates(cross, expires_at):
+    """Make ``cross`` the current snapshot and push it to /rates/stream clients"""
+    if cross.pivot in cross:
+        # Serialized before the swap, so readers of the default /rates never build it
+        for encoding in ('identity',) + BODY_ENCODINGS:
+            cross.rates_body(cross.pivot, encoding)
+    if rate_snapshot.publish(cross, expires_at).table is cross:
+        rate_broadcaster.publish(cross)
+
+def cache_cross_rates(cross, expires_at):
+    """Cache a freshly loaded pivot table and publish it as the current snapshot"""
+    rate_cache.set(RATES_PIVOT, cross, expires_at=expires_at)
+    publish_cross_rates(cross, expires_at)
+
+def load_archived_cross_rates():
+    """Latest archived pivot table if it is still fresh (warm start), else None"""
+    # Only a cold worker reads the archive, and not while it is known to be down:
+    # a refresh must not wait on the database before calling the upstream
+    if rate_snapshot.current() is not None or not rate_archive.available():
+        return None
+    try:
+        archived = rate_archive.latest(RATES_PIVOT)
+    except Exception as e:
+        print(f"⚠️ WARNING: Rate archive unavailable: {e}")
+        return None
+    if archived is None or time.time() >= archived[1]:
+        return None
+    return archived
+
+def fetch_cross_rates():
+    """Fetch the pivot table (fresh archive first, then upstream) and cache it"""
+    archived = load_archived_cross_rates() if rate_archive is not None else None
+    if archived is not None:
+        cross, expires_at = archived
+        cache_cross_rates(cross, expires_at)
+        return cross, expires_at
+
+    data = upstream.latest(RATES_PIVOT)
+    cross = CrossRates.from_payload(data, RATES_PIVOT)
+    expires_at = expires_at_for(data, RATES_CACHE_TTL)
+
+    # Only successful tables are cached, errors must hit the upstream again
+    if len(cross):
+        cache_cross_rates(cross, expires_at)
+        if rate_archive is not None:
+            rate_archive.record(cross, expires_at)
+    return cross, expires_at
+
+def load_cross_rates():
+    """Load the pivot table from the host-wide snapshot, or from the upstream"""
+    # A caller that missed just before the previous fetch landed finds it here
+    cross = rate_cache.peek(RATES_PIVOT)
+    if cross is not None:
+        return cross
+    if shared_rates is None:
+        return fetch_cross_rates()[0]
+
+    entry = shared_rates.read()
+    if not shared_rates.is_fresh(entry):
+        with shared_rates.refresh_lock(timeout=UPSTREAM_WAIT_TIMEOUT) as acquired:
+            # Another worker may have refreshed while we waited for the lock
+            entry = shared_rates.read()
+            if not shared_rates.is_fresh(entry):
+                if not acquired:
+                    # The lock holder is still fetching: serve its last table
+                    # rather than joining the herd on the upstream
+                    if entry is None:
+                        raise SingleFlightTimeout("Timed out waiting for another worker's rate fetch")
+                    cache_cross_rates(entry.cross, entry.expires_at)
+                    return entry.cross
+                cross, expires_at = fetch_cross_rates()
+                if len(cross):
+                    shared_rates.publish(cross, expires_at)
+                return cross
+    cache_cross_rates(entry.cross, entry.expires_at)
+    return entry.cross
+
+def refresh_cross_rates(key):
+    """Background refresh, coalesced with any request blocked on the same fetch"""
+    return upstream_flight.do(key, load_cross_rates)
+
+rate_refresher = RateRefresher(refresh_cross_rates)
+
+def poll_rate_stream():
+    """Load the current table so /rates/stream clients hear of tables fetched elsewhere"""
+    with app.app_context():
+        rate_broadcaster.publish(get_cross_rates())
+
+# One event loop per worker fans each new snapshot out to every /rates/stream client
+RATES_STREAM_KEEPALIVE = float(os.getenv('RATES_STREAM_KEEPALIVE', '15'))
+RATES_STREAM_POLL_INTERVAL = float(os.getenv('RATES_STREAM_POLL_INTERVAL', '30'))
+rate_broadcaster = RateBroadcaster(
+    poll=poll_rate_stream,
+    poll_interval=RATES_STREAM_POLL_INTERVAL,
+    keepalive=RATES_STREAM_KEEPALIVE
+)
+
+@app.before_request
+def unpin_rates():
+    """Each request starts without a pinned table, even if the app context is reused"""
+    g.pop('rates_table', None)
+    g.pop('rates_stale', None)
+
+def get_cross_rates():
+    """Return the request's pivot cross rates, pinned for the rest of the request"""
+    cross = g.get('rates_table')
+    if cross is None:
+        cross = g.rates_table = load_request_rates()
+    return cross
+
+def load_request_rates():
+    """Current snapshot if fresh, else the cache, serving a stale table while it is refreshed"""
+    # Lock-free fast path: one read of the current snapshot reference
+    snapshot = rate_snapshot.current()
+    if snapshot is not None and time.time() < snapshot.expires_at:
+        return snapshot.table
+    cross, stale, expires_at = rate_cache.lookup_entry(RATES_PIVOT)
+    if cross is not None:
+        if stale:
+            g.rates_stale = True
+            rate_refresher.refresh(RATES_PIVOT)
+        else:
+            # Refreshed by another worker or replica: adopt it as this worker's
+            # snapshot (fast path, max-age, wakes /rates/wait and /rates/stream)
+            publish_cross_rates(cross, expires_at)
+        return cross
+    # Nothing cached, or too stale to serve: block on the upstream
+    try:
+        return upstream_flight.do(RATES_PIVOT, load_cross_rates)
+    except Exception:
+        fallback = rate_snapshot.current()
+        if fallback is None:
+            raise
+        g.rates_stale = True
+        return fallback.table
+
+def with_rates_age(response, cross):
+    """Tell clients how old the rate table behind ``response`` is, and its version"""
+    response.headers['X-Rates-Age'] = str(int(cross.age()))
+    response.headers['X-Rates-Version'] = str(table_version(cross))
+    if g.get('rates_stale'):
+        response.headers['X-Rates-Stale'] = 'true'
+    return response
+
+def rates_etag(cross, base, variant='identity', symbols=None):
+    """Strong ETag of the /rates body for ``base``, the same in every worker serving this table"""
+    # The table version is its fetch time, so it matches across workers
+    etag = f"{cross.pivot}-{table_version(cross):x}-{base}"
+    if symbols is not None:
+        etag = f"{etag}-{'.'.join(symbols)}"
+    # Each content coding or wire format is a distinct representation
+    return etag if variant == 'identity' else f"{etag}-{variant}"
+
+def negotiate_format():
+    """Response media type picked from Accept: JSON unless a binary format is preferred"""
+    return request.accept_mimetypes.best_match(FORMATS, default=JSON)
+
+def binary_response(body, fmt, cross):
+    """Binary (MessagePack / Arrow) body, varying on Accept"""
+    response = Response(body, mimetype=fmt)
+    response.vary.add('Accept')
+    return with_rates_age(response, cross)
+
+def negotiate_encoding():
+    """Best pre-compressed variant the client accepts, or 'identity'"""
+    for encoding in BODY_ENCODINGS:
+        if request.accept_encodings[encoding]:
+            return encoding
+    return 'identity'
+
+def with_rates_caching(response, cross, etag):
+    """ETag plus a Cache-Control lifetime ending at the upstream's next update"""
+    response.set_etag(etag)
+    snapshot = rate_snapshot.current()
+    if g.get('rates_stale') or snapshot is None or snapshot.table is not cross:
+        # Expiry unknown or already past: clients must revalidate (a 304 at best)
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = max(0, int(snapshot.expires_at - time.time()))
+    return response
+
+def circuit_open_response(error):
+    """503 returned without waiting on the upstream while the breaker is open"""
+    response = jsonify({
+        "status": "error",
+        "message": str(error)
+    })
+    response.headers['Retry-After'] = str(int(error.retry_after) + 1)
+    return response, 503
+
+def upstream_error_response(error):
+    """502 for a provider error (quota reached, invalid key, outage)"""
+    return jsonify({
+        "status": "error",
+        "message": str(error)
+    }), 502
+
 @app.route('/rates')
 @conversion_counter
 def get_rates():
@@ -103,39 +428,248 @@ def get_rates():
     if EXCHANGE_API_KEY is None:
         return jsonify({"status": "error", "message": "API key not configured. Set EXCHANGE_API_KEY environment variable."}), 503
     try:
-        # Security: API key comes from environment variable
-        api_key = EXCHANGE_API_KEY
         base = request.args.get('base', 'USD')
         
-        # Validate currency code is exactly 3 uppercase letters
-        if not base.isalpha() or len(base) != 3 or not base.isupper():
+        # Validate against the ISO 4217 registry before any upstream I/O
+        if not is_known(base):
             return jsonify({
                 "status": "error", 
-                "message": "Invalid currency code. Must be 3 uppercase letters like USD, EUR, etc."
+                "message": "Invalid currency code. Must be an ISO 4217 code like USD, EUR, etc."
             }), 400
         
-        # URL SAFETY: URL encode the base currency
-        encoded_base = quote(base, safe='')
+        # Canonical form of the subset: sorted and deduplicated, used as memo key
+        symbols = request.args.get('symbols')
+        if symbols:
+            symbols = tuple(sorted({code.strip() for code in symbols.split(',')}))
+            unknown = unknown_codes(symbols)
+            if unknown:
+                return jsonify({
+                    "status": "error",
+                    "message": f"Invalid currency code(s): {', '.join(sorted(unknown))}."
+                }), 400
+        else:
+            symbols = None
         
-        # SECURITY FIX: URL encoding prevents path manipulation
-        response = requests.get(
-            f"https://v6.exchangerate-api.com/v6/{api_key}/latest/{encoded_base}",
-            timeout=5
-        )
-        data = response.json()
+        cross = get_cross_rates()
+        if not len(cross):
+            return jsonify({
+                "status": "error",
+                "message": "Exchange rate provider returned no rates."
+            }), 502
+        if base not in cross:
+            return jsonify({
+                "status": "error",
+                "message": f"Unsupported currency code: {base}"
+            }), 400
+        if symbols is not None:
+            missing = set(symbols).difference(cross.index)
+            if missing:
+                return jsonify({
+                    "status": "error",
+                    "message": f"Unsupported currency code(s): {', '.join(sorted(missing))}."
+                }), 400
+        
+        fmt = negotiate_format()
+        encoding = negotiate_encoding() if fmt == JSON else 'identity'
+        etag = rates_etag(cross, base, encoding if fmt == JSON else FORMAT_TAGS[fmt], symbols)
+        if request.if_none_match.contains_weak(etag):
+            # The client already holds this table: headers only, no body
+            response = Response(status=304)
+        elif fmt != JSON:
+            # Raw float64 buffer, no per-value formatting; full tables are encoded once per refresh
+            if symbols is None:
+                body = cross.binary_body(('rates', fmt, base), lambda: rates_body(fmt, base, *cross.rates_array(base)))
+            else:
+                body = rates_body(fmt, base, *cross.rates_array(base, symbols))
+            response = Response(body, mimetype=fmt)
+        else:
+            # Bytes serialized once per table and compressed once per coding, no jsonify on the hot path
+            response = Response(cross.rates_body(base, encoding, symbols), mimetype='application/json')
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.vary.update(('Accept', 'Accept-Encoding'))
+        return with_rates_age(with_rates_caching(response, cross, etag), cross)
+        
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
+    except UpstreamError as e:
+        return upstream_error_response(e)
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+@app.route('/rates/delta')
+def rates_delta():
+    """Rates that changed since snapshot ``since`` - GET endpoint, CSRF exempt by default"""
+    if EXCHANGE_API_KEY is None:
+        return jsonify({"status": "error", "message": "API key not configured. Set EXCHANGE_API_KEY environment variable."}), 503
+    try:
+        base = request.args.get('base', 'USD')
+        if not is_known(base):
+            return jsonify({
+                "status": "error",
+                "message": "Invalid currency code. Must be an ISO 4217 code like USD, EUR, etc."
+            }), 400
+        try:
+            since = int(request.args['since'])
+        except (KeyError, ValueError):
+            return jsonify({
+                "status": "error",
+                "message": "'since' must be a snapshot version (see X-Rates-Version)."
+            }), 400
         
+        cross = get_cross_rates()
+        if not len(cross):
+            return jsonify({
+                "status": "error",
+                "message": "Exchange rate provider returned no rates."
+            }), 502
+        if base not in cross:
+            return jsonify({
+                "status": "error",
+                "message": f"Unsupported currency code: {base}"
+            }), 400
+        
+        version = table_version(cross)
+        if since == version:
+            return with_rates_age(Response(status=204), cross)
+        
+        previous = rate_snapshot.find(since) if since < version else None
+        if previous is None or base not in previous.table:
+            # Evicted, unknown to this worker or from the future: send everything
+            response = jsonify({
+                "status": "success",
+                "base": base,
+                "version": version,
+                "full": True,
+                "conversion_rates": cross.rates_for(base)
+            })
+            return with_rates_age(response, cross)
+        
+        codes, rates, removed = cross.changes_since(previous.table, base)
+        if not codes and not removed:
+            return with_rates_age(Response(status=204), cross)
+        response = jsonify({
+            "status": "success",
+            "base": base,
+            "since": since,
+            "version": version,
+            "full": False,
+            "conversion_rates": dict(zip(codes, rates.tolist())),
+            "removed": list(removed)
+        })
+        return with_rates_age(response, cross)
+        
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
+    except UpstreamError as e:
+        return upstream_error_response(e)
+    except Exception as e:
         return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+@app.route('/rates/stream')
+def rates_stream():
+    """Server-Sent Events: one ``rates`` event per new snapshot - GET endpoint"""
+    if EXCHANGE_API_KEY is None:
+        return jsonify({"status": "error", "message": "API key not configured. Set EXCHANGE_API_KEY environment variable."}), 503
+    try:
+        # Make sure there is a table to send on connect
+        rate_broadcaster.publish(get_cross_rates())
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
+    except UpstreamError as e:
+        return upstream_error_response(e)
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+    
+    # A reconnecting EventSource sends the id of the last event it received
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    last_version = int(last_event_id) if last_event_id.isdigit() else None
+    response = Response(rate_broadcaster.stream(last_version), mimetype='text/event-stream')
+    response.cache_control.no_cache = True
+    # Stop reverse proxies (nginx) from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# Longest a /rates/wait request may stay parked
+RATES_WAIT_MAX_TIMEOUT = float(os.getenv('RATES_WAIT_MAX_TIMEOUT', '60'))
+
+@app.route('/rates/wait')
+def rates_wait():
+    """Long poll: rates as soon as a snapshot newer than ``version`` exists - GET endpoint"""
+    if EXCHANGE_API_KEY is None:
+        return jsonify({"status": "error", "message": "API key not configured. Set EXCHANGE_API_KEY environment variable."}), 503
+    try:
+        base = request.args.get('base', 'USD')
+        if not is_known(base):
+            return jsonify({
+                "status": "error",
+                "message": "Invalid currency code. Must be an ISO 4217 code like USD, EUR, etc."
+            }), 400
+        try:
+            version = int(request.args.get('version', 0))
+            timeout = float(request.args.get('timeout', 30))
+        except ValueError:
+            return jsonify({
+                "status": "error",
+                "message": "'version' must be a snapshot version and 'timeout' a number of seconds."
+            }), 400
+        if not 0 <= timeout <= RATES_WAIT_MAX_TIMEOUT:
+            return jsonify({
+                "status": "error",
+                "message": f"'timeout' must be between 0 and {RATES_WAIT_MAX_TIMEOUT:g} seconds."
+            }), 400
+        
+        # Loads or schedules a refresh of the table if needed, then parks
+        cross = get_cross_rates()
+        if table_version(cross) <= version:
+            snapshot = rate_snapshot.wait_newer(version, timeout)
+            if snapshot is None:
+                # Still nothing newer: the client polls again with the same version
+                response = Response(status=204)
+                response.cache_control.no_cache = True
+                return with_rates_age(response, cross)
+            cross = g.rates_table = snapshot.table
+        
+        if base not in cross:
+            return jsonify({
+                "status": "error",
+                "message": f"Unsupported currency code: {base}"
+            }), 400
+        response = jsonify({
             "status": "success",
-            "base": data.get("base_code", "USD"),
-            "conversion_rates": data.get("conversion_rates", {})
+            "base": base,
+            "version": table_version(cross),
+            "conversion_rates": cross.rates_for(base)
         })
+        response.cache_control.no_cache = True
+        return with_rates_age(response, cross)
         
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
+    except UpstreamError as e:
+        return upstream_error_response(e)
     except Exception as e:
         return jsonify({
             "status": "error",
             "message": str(e)
         }), 500
 
+# Upper bound on the comma-separated targets of one /convert request
+CONVERT_MAX_TARGETS = int(os.getenv('CONVERT_MAX_TARGETS', '200'))
+
+def exact_requested():
+    """True when the client asked for fixed-point results (``exact=true``)"""
+    return request.args.get('exact', '').lower() in ('1', 'true', 'yes')
+
 @app.route('/convert')
 @conversion_counter
 def convert():
@@ -144,57 +678,449 @@ def convert():
         return jsonify({"status": "error", "message": "API key not configured. Set EXCHANGE_API_KEY environment variable."}), 503
     try:
         from_curr = request.args.get('from', 'USD')
-        to_curr = request.args.get('to', 'EUR')
+        # A comma-separated 'to' converts one amount into several currencies
+        targets = list(dict.fromkeys(code.strip() for code in request.args.get('to', 'EUR').split(',')))
         amount = float(request.args.get('amount', 1))
         
-        # Validate currency codes
-        if not from_curr.isalpha() or len(from_curr) != 3 or not from_curr.isupper():
+        # Validate amount: float() also parses 'nan' and 'inf'
+        if not math.isfinite(amount) or amount <= 0:
             return jsonify({
                 "status": "error",
-                "message": "Invalid 'from' currency code. Must be 3 uppercase letters."
+                "message": "Amount must be positive."
             }), 400
         
-        if not to_curr.isalpha() or len(to_curr) != 3 or not to_curr.isupper():
+        if len(targets) > CONVERT_MAX_TARGETS:
             return jsonify({
                 "status": "error",
-                "message": "Invalid 'to' currency code. Must be 3 uppercase letters."
+                "message": f"At most {CONVERT_MAX_TARGETS} target currencies per request."
             }), 400
         
-        # Validate amount
-        if amount <= 0:
+        # Validate currency codes: one set difference against the registry, before any I/O
+        unknown = unknown_codes([from_curr, *targets])
+        if unknown:
             return jsonify({
                 "status": "error",
-                "message": "Amount must be positive."
+                "message": f"Invalid currency code(s): {', '.join(sorted(unknown))}."
             }), 400
         
-        # Security: API key comes from environment variable
-        api_key = EXCHANGE_API_KEY
+        cross = get_cross_rates()
+        unknown = {from_curr, *targets}.difference(cross.index)
+        if exact_requested():
+            return exact_convert(cross, from_curr, targets, amount, unknown)
+        if not unknown and len(targets) > 1:
+            row = cross.row(from_curr)
+            rates = row[cross.positions(targets)]
+            with np.errstate(over='ignore'):
+                converted = amount * rates
+            if not np.isfinite(converted).all():
+                return jsonify({
+                    "status": "error",
+                    "message": "Amount too large."
+                }), 400
+            response = jsonify({
+                "status": "success",
+                "from": from_curr,
+                "to": targets,
+                "amount": amount,
+                "converted": dict(zip(targets, converted.tolist())),
+                "rates": dict(zip(targets, rates.tolist()))
+            })
+            return with_rates_age(response, cross)
         
-        # URL SAFETY: URL encode the currencies
-        encoded_from = quote(from_curr, safe='')
-        encoded_to = quote(to_curr, safe='')
+        if unknown and len(targets) > 1:
+            return jsonify({
+                "status": "error",
+                "message": f"Unsupported currency code(s): {', '.join(sorted(unknown))}."
+            }), 400
         
-        # SECURITY FIX: URL encoding prevents path manipulation
-        response = requests.get(
-            f"https://v6.exchangerate-api.com/v6/{api_key}/pair/{encoded_from}/{encoded_to}/{amount}",
-            timeout=5
-        )
-        data = response.json()
+        to_curr = targets[0]
+        if not unknown:
+            # Same cross-rate formula as the frontend, no per-conversion upstream call
+            rate = cross.rate(from_curr, to_curr)
+            converted = amount * rate
+            if not math.isfinite(converted):
+                return jsonify({
+                    "status": "error",
+                    "message": "Amount too large."
+                }), 400
+        else:
+            # Registered code missing from the table: ask the provider directly
+            data = upstream.pair(from_curr, to_curr, amount)
+            rate = data.get("conversion_rate")
+            converted = data.get("conversion_result")
+            cross = None
         
-        return jsonify({
+        response = jsonify({
             "status": "success",
             "from": from_curr,
             "to": to_curr,
             "amount": amount,
-            "converted": data.get("conversion_result"),
-            "rate": data.get("conversion_rate")
+            "converted": converted,
+            "rate": rate
         })
+        return with_rates_age(response, cross) if cross is not None else response
         
     except ValueError:
         return jsonify({
             "status": "error",
             "message": "Invalid amount parameter. Must be a number."
         }), 400
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
+    except UpstreamError as e:
+        return upstream_error_response(e)
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+def exact_convert(cross, from_curr, targets, amount, unknown):
+    """Exact mode of /convert: decimal strings rounded to each currency's minor units"""
+    if unknown:
+        # No /pair fallback: the provider only returns floats
+        return jsonify({
+            "status": "error",
+            "message": f"Unsupported currency code(s): {', '.join(sorted(unknown))}."
+        }), 400
+    from_pos = cross.positions([from_curr] * len(targets))
+    to_pos = cross.positions(targets)
+    rates, scales, converted, exact, in_range = cross.convert_exact(from_pos, to_pos, np.full(len(targets), amount))
+    from_exponent = int(cross.exponents[from_pos[0]])
+    if not in_range.all():
+        return jsonify({
+            "status": "error",
+            "message": "Amount too large."
+        }), 400
+    if not exact.all():
+        return jsonify({
+            "status": "error",
+            "message": f"Amount must have at most {from_exponent} decimals for {from_curr}."
+        }), 400
+    exponents = cross.exponents[to_pos].tolist()
+    converted = [format_minor(v, e) for v, e in zip(converted.tolist(), exponents)]
+    rates = [format_minor(r, e) for r, e in zip(rates.tolist(), scales.tolist())]
+    amount = format_minor(round(amount * 10 ** from_exponent), from_exponent)
+    if len(targets) > 1:
+        payload = {"to": targets, "converted": dict(zip(targets, converted)), "rates": dict(zip(targets, rates))}
+    else:
+        payload = {"to": targets[0], "converted": converted[0], "rate": rates[0]}
+    return with_rates_age(jsonify({
+        "status": "success",
+        "exact": True,
+        "from": from_curr,
+        "amount": amount,
+        **payload
+    }), cross)
+
+@app.route('/matrix')
+def matrix():
+    """Cross-rate matrix of every currency pair, or of the ``symbols`` subset"""
+    if EXCHANGE_API_KEY is None:
+        return jsonify({"status": "error", "message": "API key not configured. Set EXCHANGE_API_KEY environment variable."}), 503
+    try:
+        symbols = request.args.get('symbols')
+        codes = None
+        if symbols:
+            codes = list(dict.fromkeys(code.strip() for code in symbols.split(',')))
+            unknown = unknown_codes(codes)
+            if unknown:
+                return jsonify({
+                    "status": "error",
+                    "message": f"Invalid currency code(s): {', '.join(sorted(unknown))}."
+                }), 400
+        
+        cross = get_cross_rates()
+        if not len(cross):
+            return jsonify({
+                "status": "error",
+                "message": "Exchange rate provider returned no rates."
+            }), 502
+        
+        if codes is not None:
+            unknown = set(codes).difference(cross.index)
+            if unknown:
+                return jsonify({
+                    "status": "error",
+                    "message": f"Unsupported currency code(s): {', '.join(sorted(unknown))}."
+                }), 400
+        
+        fmt = negotiate_format()
+        if fmt != JSON:
+            if codes is None:
+                # Computed and encoded once per refresh, like the JSON chunks
+                body = cross.binary_body(('matrix', fmt), lambda: matrix_body(fmt, cross.codes, cross.matrix()))
+            else:
+                body = matrix_body(fmt, tuple(codes), cross.matrix(cross.positions(codes)))
+            return binary_response(body, fmt, cross)
+        
+        # Streamed row by row; the full matrix body is serialized once per refresh
+        response = Response(iter(cross.matrix_chunks(codes)), mimetype='application/json')
+        response.vary.add('Accept')
+        return with_rates_age(response, cross)
+        
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
+    except UpstreamError as e:
+        return upstream_error_response(e)
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+# Upper bound on the items of one /convert/batch request
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '100000'))
+
+def parse_batch_item(item):
+    """Validate one batch item, returning ``(from, to, amount, error)``"""
+    if not isinstance(item, dict):
+        return None, None, None, "Item must be an object with from, to and amount."
+    from_curr, to_curr, amount = item.get('from'), item.get('to'), item.get('amount', 1)
+    for code in (from_curr, to_curr):
+        if not is_known(code):
+            return None, None, None, "Unsupported currency code."
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+        return None, None, None, "Invalid amount. Must be a number."
+    if not amount > 0 or amount == float('inf'):
+        return None, None, None, "Amount must be positive."
+    try:
+        amount = float(amount)
+    except OverflowError:
+        # JSON integers are unbounded, e.g. a 1 followed by 400 zeros
+        return None, None, None, "Amount too large."
+    return from_curr, to_curr, amount, None
+
+def exact_batch(cross, parsed, from_pos, to_pos, amounts, valid):
+    """Exact mode of /convert/batch: one vectorized fixed-point pass, decimal strings out"""
+    rates = np.zeros(len(parsed), dtype=np.int64)
+    scales = np.zeros(len(parsed), dtype=np.int64)
+    converted = np.zeros(len(parsed), dtype=np.int64)
+    exact = np.zeros(len(parsed), dtype=bool)
+    in_range = np.zeros(len(parsed), dtype=bool)
+    (rates[valid], scales[valid], converted[valid],
+     exact[valid], in_range[valid]) = cross.convert_exact(from_pos[valid], to_pos[valid], amounts[valid])
+    exponents = cross.exponents
+    
+    results = []
+    for (from_curr, to_curr, amount, error), ok, fp, tp, rate, scale, value, is_exact, fits in zip(
+        parsed, valid.tolist(), from_pos.tolist(), to_pos.tolist(),
+        rates.tolist(), scales.tolist(), converted.tolist(), exact.tolist(), in_range.tolist()
+    ):
+        if error is None and not ok:
+            error = "Unsupported currency code."
+        if error is None and not fits:
+            error = "Amount too large."
+        if error is None and not is_exact:
+            error = f"Amount must have at most {exponents[fp]} decimals for {from_curr}."
+        if error is not None:
+            results.append({"status": "error", "message": error})
+        else:
+            results.append({
+                "status": "success",
+                "from": from_curr,
+                "to": to_curr,
+                "amount": format_minor(round(amount * 10 ** int(exponents[fp])), int(exponents[fp])),
+                "converted": format_minor(value, int(exponents[tp])),
+                "rate": format_minor(rate, scale)
+            })
+    return {
+        "status": "success",
+        "exact": True,
+        "count": len(results),
+        "errors": sum(1 for result in results if result["status"] == "error"),
+        "results": results
+    }
+
+@app.route('/convert/batch', methods=['POST'])
+@csrf.exempt
+@conversion_counter
+def convert_batch():
+    """Convert many amounts at once - POST endpoint for API clients, CSRF exempt"""
+    if EXCHANGE_API_KEY is None:
+        return jsonify({"status": "error", "message": "API key not configured. Set EXCHANGE_API_KEY environment variable."}), 503
+    try:
+        items = request.get_json(silent=True)
+        if not isinstance(items, list):
+            return jsonify({
+                "status": "error",
+                "message": "Request body must be a JSON array of {from, to, amount} items."
+            }), 400
+        
+        if len(items) > BATCH_MAX_ITEMS:
+            return jsonify({
+                "status": "error",
+                "message": f"Too many items. At most {BATCH_MAX_ITEMS} per batch."
+            }), 413
+        
+        # One table for the whole batch: every item sees the same rates
+        cross = get_cross_rates()
+        if not len(cross):
+            return jsonify({
+                "status": "error",
+                "message": "Exchange rate provider returned no rates."
+            }), 502
+        parsed = [parse_batch_item(item) for item in items]
+        from_pos = cross.positions([p[0] for p in parsed])
+        to_pos = cross.positions([p[1] for p in parsed])
+        amounts = np.array([p[2] if p[3] is None else 0.0 for p in parsed], dtype=np.float64)
+        valid = (from_pos >= 0) & (to_pos >= 0)
+        
+        if exact_requested():
+            return with_rates_age(jsonify(exact_batch(cross, parsed, from_pos, to_pos, amounts, valid)), cross)
+        
+        rates = np.full(len(parsed), np.nan)
+        converted = np.full(len(parsed), np.nan)
+        with np.errstate(over='ignore'):
+            rates[valid], converted[valid] = cross.convert_many(from_pos[valid], to_pos[valid], amounts[valid])
+        # An overflowing product is a per-item error, never an Infinity in the body
+        errors = [
+            error if error is not None
+            else "Unsupported currency code." if not ok
+            else "Amount too large." if not finite
+            else None
+            for (_, _, _, error), ok, finite in zip(parsed, valid.tolist(), np.isfinite(converted).tolist())
+        ]
+        
+        fmt = negotiate_format()
+        if fmt != JSON:
+            failed = np.array([error is not None for error in errors], dtype=bool)
+            amounts[failed] = rates[failed] = converted[failed] = np.nan
+            body = batch_body(fmt, [p[0] for p in parsed], [p[1] for p in parsed],
+                              amounts, rates, converted, errors)
+            return binary_response(body, fmt, cross)
+        
+        results = []
+        for (from_curr, to_curr, amount, _), error, rate, value in zip(
+            parsed, errors, rates.tolist(), converted.tolist()
+        ):
+            if error is not None:
+                results.append({"status": "error", "message": error})
+            else:
+                results.append({
+                    "status": "success",
+                    "from": from_curr,
+                    "to": to_curr,
+                    "amount": amount,
+                    "converted": value,
+                    "rate": rate
+                })
+        
+        return with_rates_age(jsonify({
+            "status": "success",
+            "count": len(results),
+            "errors": sum(1 for result in results if result["status"] == "error"),
+            "results": results
+        }), cross)
+        
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
+    except UpstreamError as e:
+        return upstream_error_response(e)
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+@app.route('/convert/stream', methods=['POST'])
+@csrf.exempt
+@conversion_counter
+def convert_stream():
+    """Convert an uploaded CSV / NDJSON ledger row by row - streamed POST endpoint, CSRF exempt"""
+    if EXCHANGE_API_KEY is None:
+        return jsonify({"status": "error", "message": "API key not configured. Set EXCHANGE_API_KEY environment variable."}), 503
+    try:
+        fmt = request.args.get('format')
+        if fmt is None:
+            fmt = 'ndjson' if request.mimetype in ('application/x-ndjson', 'application/jsonl') else 'csv'
+        if fmt not in ('csv', 'ndjson'):
+            return jsonify({
+                "status": "error",
+                "message": "Invalid format. Must be 'csv' or 'ndjson'."
+            }), 400
+        
+        to_curr = request.args.get('to', 'EUR')
+        from_curr = request.args.get('from')
+        requested = {to_curr, *([from_curr] if from_curr else [])}
+        unknown = unknown_codes(requested)
+        if unknown:
+            return jsonify({
+                "status": "error",
+                "message": f"Invalid currency code(s): {', '.join(sorted(unknown))}."
+            }), 400
+        
+        # Every row of the upload is converted against this one pinned table
+        cross = get_cross_rates()
+        unknown = requested.difference(cross.index)
+        if unknown:
+            return jsonify({
+                "status": "error",
+                "message": f"Unsupported currency code(s): {', '.join(sorted(unknown))}."
+            }), 400
+        
+        converter = BulkConverter(
+            cross, to_curr,
+            amount_field=request.args.get('amount_column', 'amount'),
+            from_field=request.args.get('from_column', 'currency'),
+            from_curr=from_curr
+        )
+        # Read the body incrementally instead of letting Flask buffer the whole upload
+        lines = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+        mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'text/csv'
+        response = Response(stream_with_context(converter.stream(lines, fmt)), mimetype=mimetype)
+        return with_rates_age(response, cross)
+        
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
+    except UpstreamError as e:
+        return upstream_error_response(e)
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+@app.route('/rates/history')
+def get_rates_history():
+    """Archived rate tables for a base, newest first - served from MongoDB only"""
+    if rate_archive is None:
+        return jsonify({"status": "error", "message": "Rate history not configured. Set MONGO_URL environment variable."}), 503
+    try:
+        base = request.args.get('base', 'USD')
+        limit = int(request.args.get('limit', 24))
+        
+        if not is_known(base):
+            return jsonify({
+                "status": "error",
+                "message": "Invalid currency code. Must be an ISO 4217 code like USD, EUR, etc."
+            }), 400
+        
+        if not 1 <= limit <= 100:
+            return jsonify({
+                "status": "error",
+                "message": "Limit must be between 1 and 100."
+            }), 400
+        
+        snapshots = [
+            {
+                "fetched_at": cross.fetched_at,
+                "conversion_rates": cross.rates_for(base)
+            }
+            for cross in rate_archive.history(RATES_PIVOT, limit=limit)
+            if base in cross
+        ]
+        return jsonify({
+            "status": "success",
+            "base": base,
+            "snapshots": snapshots
+        })
+        
+    except ValueError:
+        return jsonify({
+            "status": "error",
+            "message": "Invalid limit parameter. Must be an integer."
+        }), 400
     except Exception as e:
         return jsonify({
             "status": "error",
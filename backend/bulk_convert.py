@@ -0,0 +1,157 @@
+"""Streaming conversion of CSV / NDJSON ledgers in fixed-size chunks"""
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import json
+import math
+import sys
+
+import numpy as np
+
+CHUNK_SIZE = 10000
+CONVERTED_FIELD = "converted_amount"
+
+
+def chunked(iterable, size):
+    """Yield lists of at most ``size`` items without materializing ``iterable``"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _amount(value):
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return amount if math.isfinite(amount) else math.nan
+
+
+def convert_chunk(cross, from_codes, amounts, to_curr):
+    """Convert one chunk against ``cross``; NaN marks rows that cannot be converted"""
+    amounts = np.fromiter((_amount(a) for a in amounts), dtype=np.float64, count=len(amounts))
+    from_pos = cross.positions(from_codes)
+    to_pos = cross.index.get(to_curr, -1)
+    converted = np.full(len(amounts), np.nan)
+    valid = (from_pos >= 0) & ~np.isnan(amounts)
+    if to_pos >= 0 and valid.any():
+        to_pos = np.full(int(valid.sum()), to_pos, dtype=np.intp)
+        with np.errstate(over="ignore"):
+            converted[valid] = cross.convert_many(from_pos[valid], to_pos, amounts[valid])[1]
+        # Finite amounts can still overflow once converted
+        converted[~np.isfinite(converted)] = np.nan
+    return converted
+
+
+class BulkConverter:
+    """Convert ledger rows against one pinned rate table.
+
+    Rows are read lazily from a text stream, ``chunk_size`` at a time, and
+    each chunk is converted in one vectorized pass. The source currency is
+    read from ``from_field`` unless a fixed ``from_curr`` is given. Output
+    is produced chunk by chunk, so memory does not grow with the input.
+    """
+
+    def __init__(self, cross, to_curr, amount_field="amount", from_field="currency",
+                 from_curr=None, chunk_size=CHUNK_SIZE):
+        self.cross = cross
+        self.to_curr = to_curr
+        self.amount_field = amount_field
+        self.from_field = from_field
+        self.from_curr = from_curr
+        self.chunk_size = chunk_size
+        self.rows = 0
+        self.errors = 0
+
+    def _convert(self, records):
+        if self.from_curr is not None:
+            from_codes = [self.from_curr] * len(records)
+        else:
+            from_codes = [record.get(self.from_field) for record in records]
+        amounts = [record.get(self.amount_field) for record in records]
+        converted = convert_chunk(self.cross, from_codes, amounts, self.to_curr)
+        self.rows += len(records)
+        self.errors += int(np.isnan(converted).sum())
+        return converted.tolist()
+
+    def csv(self, lines):
+        """Yield CSV text with a ``converted_amount`` column appended"""
+        reader = csv.DictReader(lines)
+        fieldnames = list(reader.fieldnames or []) + [CONVERTED_FIELD]
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore", lineterminator="\n")
+        writer.writeheader()
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        for records in chunked(reader, self.chunk_size):
+            for record, value in zip(records, self._convert(records)):
+                record[CONVERTED_FIELD] = "" if math.isnan(value) else repr(value)
+                writer.writerow(record)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    def ndjson(self, lines):
+        """Yield NDJSON text, each object extended with ``converted_amount``"""
+        for chunk in chunked((line for line in lines if line.strip()), self.chunk_size):
+            records = []
+            for line in chunk:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                records.append(record if isinstance(record, dict) else None)
+            out = []
+            for record, value in zip(records, self._convert([r or {} for r in records])):
+                if record is None:
+                    record = {"error": "Invalid JSON object."}
+                else:
+                    record[CONVERTED_FIELD] = None if math.isnan(value) else value
+                out.append(json.dumps(record))
+            yield "\n".join(out) + "\n"
+
+    def stream(self, lines, fmt):
+        """Dispatch on ``fmt`` (``csv`` or ``ndjson``)"""
+        if fmt == "ndjson":
+            return self.ndjson(lines)
+        return self.csv(lines)
+
+
+def main(argv=None):
+    """Command line entry point: convert a ledger file using the service's rate cache"""
+    parser = argparse.ArgumentParser(description="Append a converted amount column to a CSV or NDJSON ledger.")
+    parser.add_argument("input", help="ledger file, '-' for stdin")
+    parser.add_argument("--to", required=True, help="target currency code")
+    parser.add_argument("--from", dest="from_curr", help="fixed source currency (default: per-row column)")
+    parser.add_argument("--from-column", default="currency")
+    parser.add_argument("--amount-column", default="amount")
+    parser.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    # Imported here so the rate cache, shared snapshot and upstream settings match the service;
+    # its startup warnings go to stderr, stdout only carries the converted ledger
+    with contextlib.redirect_stdout(sys.stderr):
+        from app import app, get_cross_rates
+
+    with app.app_context():
+        cross = get_cross_rates()
+    converter = BulkConverter(cross, args.to, amount_field=args.amount_column,
+                              from_field=args.from_column, from_curr=args.from_curr,
+                              chunk_size=args.chunk_size)
+    source = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    with source:
+        for text in converter.stream(source, args.format):
+            sys.stdout.write(text)
+    print(f"{converter.rows} rows, {converter.errors} not converted", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Circuit breaker protecting the workers from a slow or failing upstream"""
+import threading
+import time
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+# Numeric encoding used for the Prometheus gauge
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream while the circuit is open"""
+
+    def __init__(self, retry_after):
+        super().__init__("Exchange rate provider unavailable, circuit breaker is open.")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker around upstream calls.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    every call fails fast with ``CircuitOpenError`` for ``reset_timeout``
+    seconds. The first call after that is a half-open probe: success closes
+    the circuit, failure opens it again. Other calls keep failing fast while
+    the probe runs. ``on_change(state, failures)`` is called on transitions.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, on_change=None, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.on_change = on_change
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.opens = 0
+        self.rejected = 0
+        self._probing = False
+
+    def _set_state(self, state):
+        # Called with the lock held
+        changed = state != self.state
+        self.state = state
+        if state == OPEN:
+            self.opened_at = self._clock()
+            self.opens += changed
+        if self.on_change is not None:
+            self.on_change(state, self.failures)
+
+    def _before_call(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            remaining = self.opened_at + self.reset_timeout - self._clock()
+            if self.state == OPEN and remaining <= 0:
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+            raise CircuitOpenError(retry_after=max(0.0, remaining))
+
+    def call(self, fn, *args, **kwargs):
+        """Run ``fn`` through the breaker"""
+        self._before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._probing = False
+                self.failures += 1
+                if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                    self._set_state(OPEN)
+                elif self.on_change is not None:
+                    self.on_change(self.state, self.failures)
+            raise
+        with self._lock:
+            self._probing = False
+            if self.state != CLOSED or self.failures:
+                self.failures = 0
+                self._set_state(CLOSED)
+        return result
+
+    def reset(self):
+        """Force the circuit closed and forget past failures"""
+        with self._lock:
+            self._probing = False
+            self.failures = 0
+            self._set_state(CLOSED)
+
+    def stats(self):
+        """Snapshot of the breaker state, suitable for JSON output"""
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "opens": self.opens,
+                "rejected": self.rejected,
+            }
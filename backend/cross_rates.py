@@ -0,0 +1,318 @@
+"""Cross-rate engine: every base currency derived from a single pivot table"""
+import gzip
+import json
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import brotli
+except ImportError:  # optional: bodies are then offered as gzip and identity only
+    brotli = None
+
+import currencies
+import fixed_point
+
+# Binary form: pivot code, fetched_at, currency count, then codes and float64 values
+TABLE_HEADER = struct.Struct("<3sxdI4x")
+_REGISTRY_CODES = "".join(currencies.CODES_BY_INDEX).encode("ascii")
+
+# Pre-serialized /rates bodies kept per table, LRU beyond that (symbol subsets)
+MAX_BODIES = 512
+
+# Content-Encoding values of the pre-serialized bodies, best first
+BODY_ENCODINGS = (("br",) if brotli is not None else ()) + ("gzip",)
+# Compression levels: full tables are served all day long, a symbol subset
+# may be requested only once
+FULL_BODY_LEVELS = {"gzip": 9, "br": 11}
+SUBSET_BODY_LEVELS = {"gzip": 6, "br": 5}
+
+
+def _aligned(size, alignment=8):
+    return (size + alignment - 1) // alignment * alignment
+
+
+def _compress(body, encoding, level):
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    return brotli.compress(body, quality=level)
+
+
+class CrossRates:
+    """Rate tables for every base, computed from one upstream pivot table.
+
+    The pivot rates are held in a float64 array with one slot per currency
+    of the registry: ``currencies.INDEX`` gives the offset of a code, and
+    slots the provider did not quote are NaN. The table for any other base
+    ``B`` is ``values / values[B]``: one vectorized division. Derived rows
+    are memoized (bounded LRU, ``max_rows``) so the busiest bases are
+    computed once per pivot refresh.
+
+    Instances use ``__slots__`` and hold no per-currency Python objects
+    besides the shared ``index``, so a table costs about one float per
+    currency. ``to_bytes`` / ``from_bytes`` serialize the array as is.
+    """
+
+    __slots__ = ("pivot", "fetched_at", "values", "offsets", "codes", "index",
+                 "max_rows", "_rows", "_matrix_chunks", "_bodies", "_binary_bodies", "_lock")
+
+    def __init__(self, pivot, rates, max_rows=32, fetched_at=None):
+        # Zero or negative rates cannot be divided by, drop them at load time
+        rates = {
+            code: float(value) for code, value in rates.items()
+            if code in currencies.INDEX and value and float(value) > 0
+        }
+        if rates and pivot in currencies.INDEX:
+            rates.setdefault(pivot, 1.0)
+        values = np.full(currencies.SIZE, np.nan)
+        for code, value in rates.items():
+            values[currencies.INDEX[code]] = value
+        self._init_arrays(pivot, values, max_rows, fetched_at)
+
+    def _init_arrays(self, pivot, values, max_rows, fetched_at):
+        self.pivot = pivot
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        self.values = values
+        if values.flags.writeable:
+            self.values.flags.writeable = False
+        # Registry offsets of the quoted currencies, in code order
+        self.offsets = np.flatnonzero(~np.isnan(values))
+        self.codes = tuple(currencies.CODES_BY_INDEX[i] for i in self.offsets.tolist())
+        self.index = {code: currencies.INDEX[code] for code in self.codes}
+        self.max_rows = max_rows
+        self._rows = OrderedDict()
+        self._matrix_chunks = None
+        self._bodies = OrderedDict()
+        self._binary_bodies = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_arrays(cls, pivot, codes, values, max_rows=32, fetched_at=None):
+        """Wrap ``values`` laid out as ``codes``.
+
+        An array already in registry layout (e.g. a shared mapping) is used
+        without copying; any other layout is scattered into a new one.
+        """
+        codes = tuple(codes)
+        if codes != currencies.CODES_BY_INDEX:
+            dense = np.full(currencies.SIZE, np.nan)
+            for code, value in zip(codes, np.asarray(values, dtype=np.float64).tolist()):
+                if code in currencies.INDEX:
+                    dense[currencies.INDEX[code]] = value
+            values = dense
+        cross = cls.__new__(cls)
+        cross._init_arrays(pivot, values, max_rows, fetched_at)
+        return cross
+
+    @classmethod
+    def from_payload(cls, payload, pivot, max_rows=32):
+        """Build from an upstream ``latest`` payload"""
+        return cls(
+            payload.get("base_code") or pivot,
+            payload.get("conversion_rates") or {},
+            max_rows=max_rows,
+        )
+
+    def to_bytes(self):
+        """Binary form for caches stored outside the process, in registry layout"""
+        header = TABLE_HEADER.pack(self.pivot.encode("ascii"), self.fetched_at, currencies.SIZE)
+        padding = b"\0" * (_aligned(len(header) + len(_REGISTRY_CODES)) - len(header) - len(_REGISTRY_CODES))
+        values = np.ascontiguousarray(self.values, dtype="<f8")
+        return b"".join((header, _REGISTRY_CODES, padding, memoryview(values).cast("B")))
+
+    @classmethod
+    def from_bytes(cls, data, max_rows=32):
+        """Inverse of ``to_bytes``; the values stay a read-only view over ``data``"""
+        pivot, fetched_at, count = TABLE_HEADER.unpack_from(data, 0)
+        codes_end = TABLE_HEADER.size + 3 * count
+        raw_codes = bytes(data[TABLE_HEADER.size:codes_end])
+        if raw_codes == _REGISTRY_CODES:
+            codes = currencies.CODES_BY_INDEX
+        else:
+            raw_codes = raw_codes.decode("ascii")
+            codes = tuple(raw_codes[i:i + 3] for i in range(0, len(raw_codes), 3))
+        values = np.frombuffer(data, dtype="<f8", count=count, offset=_aligned(codes_end))
+        return cls.from_arrays(pivot.decode("ascii"), codes, values, max_rows=max_rows, fetched_at=fetched_at)
+
+    def pivot_values(self):
+        """Pivot rates of the quoted currencies only, aligned with ``codes``"""
+        return self.values[self.offsets]
+
+    def __contains__(self, code):
+        return code in self.index
+
+    def __len__(self):
+        return len(self.codes)
+
+    def age(self, now=None):
+        """Seconds elapsed since the pivot table was fetched"""
+        now = time.time() if now is None else now
+        return max(0.0, now - self.fetched_at)
+
+    def row(self, base):
+        """Rates of every currency expressed in ``base``, as a read-only array"""
+        with self._lock:
+            row = self._rows.get(base)
+            if row is not None:
+                self._rows.move_to_end(base)
+                return row
+        row = self.values / self.values[self.index[base]]
+        row.flags.writeable = False
+        with self._lock:
+            self._rows[base] = row
+            while len(self._rows) > self.max_rows:
+                self._rows.popitem(last=False)
+        return row
+
+    def rates_array(self, base, symbols=None):
+        """``(codes, rates)`` for ``base``, the float64 row sliced to the quoted currencies.
+
+        ``symbols`` (codes present in the table) restricts it to a subset.
+        """
+        if symbols is None:
+            return self.codes, self.row(base)[self.offsets]
+        return tuple(symbols), self.row(base)[self.positions(symbols)]
+
+    def rates_for(self, base, symbols=None):
+        """``{code: rate}`` table for ``base``, same shape as ``conversion_rates``"""
+        codes, rates = self.rates_array(base, symbols)
+        return dict(zip(codes, rates.tolist()))
+
+    def changes_since(self, older, base):
+        """What changed in the ``base`` rates since ``older``: ``(codes, rates, removed)``.
+
+        One vectorized compare of the two dense rows; ``codes`` / ``rates``
+        are the currencies with a new or different rate, ``removed`` the
+        ones ``older`` quoted and this table no longer does. ``base`` must
+        be in both tables.
+        """
+        new, old = self.row(base), older.row(base)
+        new_missing, old_missing = np.isnan(new), np.isnan(old)
+        changed = np.flatnonzero(~new_missing & (old_missing | (new != old)))
+        removed = np.flatnonzero(new_missing & ~old_missing)
+        by_index = currencies.CODES_BY_INDEX
+        return (
+            tuple(by_index[i] for i in changed.tolist()),
+            new[changed],
+            tuple(by_index[i] for i in removed.tolist()),
+        )
+
+    def rate(self, from_curr, to_curr):
+        """Cross rate to convert one unit of ``from_curr`` into ``to_curr``"""
+        return float(self.values[self.index[to_curr]] / self.values[self.index[from_curr]])
+
+    def positions(self, codes):
+        """Registry offsets of ``codes`` in ``values``, -1 for currencies without a rate"""
+        index = self.index
+        return np.fromiter((index.get(code, -1) for code in codes), dtype=np.intp, count=len(codes))
+
+    def convert_many(self, from_pos, to_pos, amounts):
+        """Vectorized ``amount * rate`` for arrays of positions, returns ``(rates, converted)``.
+
+        Every position must be valid (see ``positions``); all items are
+        evaluated against this one table.
+        """
+        rates = self.values[to_pos] / self.values[from_pos]
+        return rates, amounts * rates
+
+    @property
+    def exponents(self):
+        """ISO 4217 minor units aligned with ``values`` (the registry table)"""
+        return currencies.MINOR_UNITS
+
+    def convert_exact(self, from_pos, to_pos, amounts):
+        """Fixed-point ``convert_many``, returns ``(rates, scales, converted, exact, in_range)``.
+
+        ``rates / 10**scales`` are the cross rates (``fixed_point.RATE_DIGITS``
+        significant digits each) and ``converted`` int64 minor units of each
+        target currency, rounded half-even. ``exact`` is False where an
+        amount has more decimals than its currency allows, ``in_range``
+        where the amount or the result is too large for int64 minor units.
+        """
+        exponents = self.exponents
+        minor, exact, in_range = fixed_point.to_minor(amounts, exponents[from_pos])
+        rates, scales, converted, ok = fixed_point.convert_exact(self.values, from_pos, to_pos, exponents, minor)
+        return rates, scales, converted, exact, in_range & ok
+
+    def matrix(self, positions=None):
+        """N x N cross rates, ``matrix[i, j]`` converts one ``codes[i]`` into ``codes[j]``.
+
+        Computed as one outer division of the pivot values; ``positions``
+        restricts both axes to a subset (see ``positions``).
+        """
+        values = self.values[self.offsets if positions is None else positions]
+        return values[np.newaxis, :] / values[:, np.newaxis]
+
+    def matrix_chunks(self, codes=None):
+        """JSON body of ``matrix`` as a list of byte chunks, one per row.
+
+        The full matrix is serialized once per table and memoized, so
+        repeated requests only stream the cached chunks.
+        """
+        if codes is None and self._matrix_chunks is not None:
+            return self._matrix_chunks
+        selected = self.codes if codes is None else tuple(codes)
+        grid = self.matrix(None if codes is None else self.positions(selected))
+        chunks = [
+            b'{"status":"success","pivot":' + json.dumps(self.pivot).encode()
+            + b',"codes":' + json.dumps(selected).encode() + b',"rows":['
+        ]
+        for i, row in enumerate(grid.tolist()):
+            chunks.append((b"," if i else b"") + json.dumps(row).encode())
+        chunks.append(b"]}")
+        if codes is None:
+            self._matrix_chunks = chunks
+        return chunks
+
+    def binary_body(self, key, build):
+        """Body memoized under ``key`` for the lifetime of this table, built by ``build()``.
+
+        Used for the full-table MessagePack / Arrow bodies, keyed e.g. by
+        ``("matrix", fmt)``; subsets are not memoized, callers build those
+        directly.
+        """
+        with self._lock:
+            body = self._binary_bodies.get(key)
+        if body is None:
+            body = build()
+            with self._lock:
+                body = self._binary_bodies.setdefault(key, body)
+        return body
+
+    def rates_body(self, base, encoding="identity", symbols=None):
+        """``/rates`` JSON body for ``base`` in one content ``encoding``, as bytes.
+
+        The JSON is serialized on first use and each encoding (``gzip`` and,
+        when the brotli package is installed, ``br``) is compressed the first
+        time a client asks for it; all are kept for the lifetime of this
+        table. Subsets are compressed at cheaper levels, since many are only
+        ever requested once. ``symbols`` must be a canonical (sorted) tuple;
+        each subset is memoized under it, the least used ones are evicted
+        past ``MAX_BODIES``.
+        """
+        key = (base, symbols)
+        with self._lock:
+            bodies = self._bodies.get(key)
+            if bodies is not None:
+                self._bodies.move_to_end(key)
+                body = bodies.get(encoding)
+                if body is not None:
+                    return body
+        if bodies is None:
+            identity = json.dumps(
+                {"status": "success", "base": base, "conversion_rates": self.rates_for(base, symbols)},
+                separators=(",", ":"),
+            ).encode()
+            with self._lock:
+                bodies = self._bodies.setdefault(key, {"identity": identity})
+                while len(self._bodies) > MAX_BODIES:
+                    self._bodies.popitem(last=False)
+            if encoding == "identity":
+                return bodies["identity"]
+        levels = FULL_BODY_LEVELS if symbols is None else SUBSET_BODY_LEVELS
+        body = _compress(bodies["identity"], encoding, levels[encoding])
+        with self._lock:
+            return bodies.setdefault(encoding, body)
@@ -0,0 +1,169 @@
+"""Exact fixed-point conversion rounded to each currency's ISO 4217 minor units"""
+import numpy as np
+
+import currencies
+
+# Significant digits kept in every cross rate: the int64 mantissa stays
+# below 2**53, so it is built from the float rate without extra rounding
+RATE_DIGITS = 15
+# Largest amount accepted, in minor units: keeps the float parse exact (< 2**53)
+MAX_MINOR = 10 ** 15
+# Largest power of ten divided in one limb pass (must stay below 2**32)
+_STEP_DIGITS = 9
+
+_LOW = np.uint64(0xFFFFFFFF)
+_SHIFT = np.uint64(32)
+_INT64_LIMIT = np.uint64(2 ** 63)
+
+
+def minor_units(code):
+    """Number of decimals of a registered currency"""
+    return currencies.REGISTRY[code].minor_units
+
+
+def to_minor(amounts, exponents):
+    """Amounts as int64 minor units, returns ``(minor, exact, in_range)``.
+
+    ``exact`` is False where an amount has more decimals than its currency
+    allows (``10.005`` USD is rejected rather than silently rounded),
+    ``in_range`` where it is not finite or exceeds ``MAX_MINOR``.
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    factors = 10.0 ** exponents
+    with np.errstate(over="ignore", invalid="ignore"):
+        scaled = np.rint(amounts * factors)
+        in_range = np.isfinite(scaled) & (np.abs(scaled) <= MAX_MINOR)
+        exact = in_range & (scaled / factors == amounts)
+    return np.where(exact, scaled, 0).astype(np.int64), exact, in_range
+
+
+def exact_rates(values, from_pos, to_pos):
+    """Cross rates as ``mantissa / 10**scale`` with ``RATE_DIGITS`` significant digits.
+
+    Returns ``(mantissas, scales)``, both int64. The scale is chosen per
+    pair, so a rate of ``7.3e-6`` keeps as many digits as one of ``137000``.
+    """
+    rates = values[to_pos] / values[from_pos]
+    lead = np.floor(np.log10(rates)).astype(np.int64)
+    scales = RATE_DIGITS - 1 - lead
+    mantissas = np.rint(rates * 10.0 ** scales)
+    # log10 can land one off next to a power of ten
+    low = mantissas < 10 ** (RATE_DIGITS - 1)
+    high = mantissas >= 10 ** RATE_DIGITS
+    scales = scales + low - high
+    mantissas = np.rint(rates * 10.0 ** scales)
+    return mantissas.astype(np.int64), scales
+
+
+def _mul_limbs(a, b):
+    """Unsigned 128-bit ``a * b`` as four 32-bit limbs, most significant first"""
+    a0, a1 = a & _LOW, a >> _SHIFT
+    b0, b1 = b & _LOW, b >> _SHIFT
+    p00, p01, p10, p11 = a0 * b0, a0 * b1, a1 * b0, a1 * b1
+    mid = (p00 >> _SHIFT) + (p01 & _LOW) + (p10 & _LOW)
+    high = (mid >> _SHIFT) + (p01 >> _SHIFT) + (p10 >> _SHIFT) + (p11 & _LOW)
+    return [
+        (high >> _SHIFT) + (p11 >> _SHIFT),
+        high & _LOW,
+        mid & _LOW,
+        p00 & _LOW,
+    ]
+
+
+def _div_limbs(limbs, divisor):
+    """Long division of the limbs by ``divisor`` (< 2**32, scalar or per item)"""
+    remainder = np.zeros_like(limbs[0])
+    quotient = []
+    for limb in limbs:
+        current = (remainder << _SHIFT) | limb
+        quotient.append(current // divisor)
+        remainder = current % divisor
+    return quotient, remainder
+
+
+def _signed_result(limbs, remainder, divisor, sticky, negative):
+    """Round the quotient half-even and restore the sign, returns ``(result, ok)``.
+
+    ``sticky`` marks items whose earlier divisions left a remainder: the
+    discarded fraction is then strictly above ``remainder / divisor``.
+    """
+    q3, q2, q1, q0 = limbs
+    result = (q1 << _SHIFT) | q0
+    fits = (q3 == 0) & (q2 == 0) & (result < _INT64_LIMIT)
+    twice = remainder * np.uint64(2)
+    odd = (result & np.uint64(1)) == 1
+    result = result + ((twice > divisor) | ((twice == divisor) & (sticky | odd)))
+    ok = fits & (result < _INT64_LIMIT)
+    result = np.where(ok, result, 0).astype(np.int64)
+    return np.where(negative, -result, result), ok
+
+
+def _unsigned(a, b):
+    a = np.asarray(a, dtype=np.int64)
+    b = np.asarray(b, dtype=np.int64)
+    negative = (a < 0) ^ (b < 0)
+    return np.abs(a).astype(np.uint64), np.abs(b).astype(np.uint64), negative
+
+
+def mul_div_round(a, b, divisor):
+    """Exact ``round_half_even(a * b / divisor)`` for int64 arrays.
+
+    The 126-bit product is built from 32-bit limbs and divided limb by limb,
+    so nothing overflows and no float is involved. ``divisor`` must be below
+    2**32. Returns ``(result, ok)``; ``ok`` is False where the result does
+    not fit in an int64.
+    """
+    a, b, negative = _unsigned(a, b)
+    d = np.uint64(divisor)
+    limbs, remainder = _div_limbs(_mul_limbs(a, b), d)
+    return _signed_result(limbs, remainder, d, np.zeros(a.shape, dtype=bool), negative)
+
+
+def mul_div_pow10(a, b, scales):
+    """Exact ``round_half_even(a * b / 10**scales)`` with a power of ten per item.
+
+    Same limb arithmetic as ``mul_div_round``; large scales are divided in
+    steps of at most 10**9, keeping track of any remainder dropped on the
+    way so the final rounding is still exact. Returns ``(result, ok)``.
+    """
+    a, b, negative = _unsigned(a, b)
+    remaining = np.asarray(scales, dtype=np.int64) + np.zeros(a.shape, dtype=np.int64)
+    limbs = _mul_limbs(a, b)
+    last_remainder = np.zeros(a.shape, dtype=np.uint64)
+    last_divisor = np.ones(a.shape, dtype=np.uint64)
+    sticky = np.zeros(a.shape, dtype=bool)
+    while (remaining > 0).any():
+        step = np.minimum(remaining, _STEP_DIGITS)
+        divisor = (10 ** step).astype(np.uint64)
+        limbs, remainder = _div_limbs(limbs, divisor)
+        active = step > 0
+        sticky |= active & (last_remainder != 0)
+        last_remainder = np.where(active, remainder, last_remainder)
+        last_divisor = np.where(active, divisor, last_divisor)
+        remaining = remaining - step
+    return _signed_result(limbs, last_remainder, last_divisor, sticky, negative)
+
+
+def convert_exact(values, from_pos, to_pos, exponents, minor_amounts):
+    """Vectorized exact conversion, returns ``(mantissas, scales, converted_minor, ok)``.
+
+    ``mantissas / 10**scales`` is the rate between major units; the
+    minor-unit shift is applied to the divisor, not to the rate, so no
+    significant digit of the rate is lost. ``ok`` is False where the
+    result does not fit in an int64.
+    """
+    mantissas, scales = exact_rates(values, from_pos, to_pos)
+    divisors = scales - (exponents[to_pos] - exponents[from_pos])
+    # Only rates above ~1e10 would need a negative power of ten: not supported
+    ok = (scales >= 0) & (divisors >= 0)
+    converted, fits = mul_div_pow10(minor_amounts, mantissas, np.maximum(divisors, 0))
+    return mantissas, scales, converted, ok & fits
+
+
+def format_minor(value, exponent):
+    """Render an integer count of minor units as a decimal string (``1234, 2 -> '12.34'``)"""
+    sign = "-" if value < 0 else ""
+    units, fraction = divmod(abs(int(value)), 10 ** exponent)
+    if not exponent:
+        return f"{sign}{units}"
+    return f"{sign}{units}.{fraction:0{exponent}d}"
@@ -0,0 +1,351 @@
+"""Caches for upstream exchange rate tables: in-process LRU or Redis"""
+import logging
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    from redis.exceptions import RedisError
+except ImportError:  # optional: only the Redis backend needs it
+    RedisError = OSError
+
+logger = logging.getLogger(__name__)
+
+
+def expires_at_for(payload, default_ttl, min_ttl=60, now=None):
+    """Compute the expiry timestamp of an upstream ``latest`` payload.
+
+    The upstream announces when it will publish new rates through
+    ``time_next_update_unix``; caching past that point would serve old data,
+    refreshing before it only burns quota. Payloads without the field (or
+    with a value already in the past) fall back to ``default_ttl``.
+    """
+    now = time.time() if now is None else now
+    next_update = payload.get("time_next_update_unix") if isinstance(payload, dict) else None
+    try:
+        next_update = float(next_update)
+    except (TypeError, ValueError):
+        return now + default_ttl
+    if next_update <= now:
+        return now + min(default_ttl, min_ttl)
+    return max(next_update, now + min_ttl)
+
+
+class CacheBackend:
+    """Interface shared by the rate table caches.
+
+    ``lookup_entry`` is the primitive; ``lookup``, ``get`` and ``get_many``
+    derive from it, the last two only return fresh values. Implementations
+    report their counters through ``stats``.
+    """
+
+    def lookup_entry(self, key):
+        raise NotImplementedError
+
+    def lookup(self, key):
+        """Return ``(value, stale)`` for ``key``, see ``lookup_entry``"""
+        value, stale, _ = self.lookup_entry(key)
+        return value, stale
+
+    def peek(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, expires_at=None):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
+
+    def get(self, key):
+        """Return the cached value for ``key``, or None if absent or expired"""
+        value, stale = self.lookup(key)
+        return None if stale else value
+
+    def get_many(self, keys):
+        """``{key: value}`` of the fresh values among ``keys``"""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+
+class RateCache(CacheBackend):
+    """Thread-safe LRU cache of rate tables with per-entry expiry.
+
+    Keys are currency codes, values are rate tables. Once ``max_entries``
+    is reached the least recently used entry is evicted. Expired entries are
+    kept for another ``max_stale`` seconds so callers can keep serving them
+    while a fresh table is fetched (stale-while-revalidate).
+    """
+
+    def __init__(self, max_entries=64, default_ttl=3600, max_stale=0, clock=time.time):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.max_stale = max_stale
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def lookup_entry(self, key):
+        """Return ``(value, stale, expires_at)`` for ``key``.
+
+        ``stale`` is True when the entry has expired but is still within the
+        ``max_stale`` window. ``(None, False, None)`` means there is nothing
+        usable.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False, None
+            value, expires_at = entry
+            now = self._clock()
+            if now >= expires_at:
+                if now >= expires_at + self.max_stale:
+                    del self._entries[key]
+                    self.expirations += 1
+                    self.misses += 1
+                    return None, False, None
+                self.stale_hits += 1
+                return value, True, expires_at
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value, False, expires_at
+
+    def peek(self, key):
+        """Like ``get`` but without touching the counters or the LRU order"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._clock() >= entry[1]:
+                return None
+            return entry[0]
+
+    def set(self, key, value, expires_at=None):
+        """Store ``value`` under ``key`` until ``expires_at`` (default: now + TTL)"""
+        if expires_at is None:
+            expires_at = self._clock() + self.default_ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.stale_hits = self.misses = 0
+            self.expirations = self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Snapshot of the cache counters, suitable for JSON output"""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "backend": "memory",
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Header of every Redis payload: expires_at as a little-endian double
+ENVELOPE = struct.Struct("<d")
+
+
+class RedisRateCache(CacheBackend):
+    """Rate table cache stored in Redis, shared by every backend replica.
+
+    ``client`` is any Redis-protocol client (``redis.Redis``, fakeredis, ...).
+    Values go through ``encode``/``decode`` (bytes in, bytes out) and are
+    stored behind a small binary header holding ``expires_at``, so the
+    payload reaches ``decode`` as a view, not a copy. Each key expires in Redis
+    at ``expires_at + max_stale``, aligned with the upstream refresh time.
+    The last decoded value is memoized per key so unchanged payloads are
+    not decoded again. Lookup counters are also kept in a Redis hash, which
+    gives the hit ratio across all replicas.
+
+    Redis being unreachable is not fatal: failed reads count as misses,
+    failed writes are dropped, and both are logged and counted in
+    ``errors``, so callers fall through to the upstream.
+    """
+
+    def __init__(self, client, encode, decode, default_ttl=3600, max_stale=0,
+                 prefix="currency-converter:rates:", clock=time.time):
+        self.client = client
+        self.encode = encode
+        self.decode = decode
+        self.default_ttl = default_ttl
+        self.max_stale = max_stale
+        self.prefix = prefix
+        self.stats_key = f"{prefix}stats"
+        self._clock = clock
+        self._decoded = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.last_error = None
+
+    def _key(self, key):
+        return f"{self.prefix}{key}"
+
+    def _unpack(self, key, raw):
+        """``(value, expires_at)`` from a stored payload, reusing the last decode"""
+        memo = self._decoded.get(key)
+        if memo is not None and memo[0] == raw:
+            return memo[1], memo[2]
+        (expires_at,) = ENVELOPE.unpack_from(raw, 0)
+        value = self.decode(memoryview(raw)[ENVELOPE.size:])
+        self._decoded[key] = (raw, value, expires_at)
+        return value, expires_at
+
+    def _classify(self, key, raw):
+        if raw is None:
+            return None, False, None, "misses"
+        value, expires_at = self._unpack(key, raw)
+        if self._clock() >= expires_at:
+            return value, True, expires_at, "stale_hits"
+        return value, False, expires_at, "hits"
+
+    def _failed(self, operation, error):
+        logger.warning("Redis rate cache %s failed: %s", operation, error)
+        with self._lock:
+            self.errors += 1
+            self.last_error = str(error)
+
+    def _count(self, pipe, outcome, amount=1):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + amount)
+        pipe.hincrby(self.stats_key, outcome, amount)
+
+    def lookup_entry(self, key):
+        """Return ``(value, stale, expires_at)`` for ``key``, see ``RateCache.lookup_entry``"""
+        try:
+            raw = self.client.get(self._key(key))
+        except RedisError as e:
+            self._failed("lookup", e)
+            with self._lock:
+                self.misses += 1
+            return None, False, None
+        value, stale, expires_at, outcome = self._classify(key, raw)
+        pipe = self.client.pipeline(transaction=False)
+        self._count(pipe, outcome)
+        try:
+            pipe.execute()
+        except RedisError as e:
+            self._failed("stats update", e)
+        return value, stale, expires_at
+
+    def get_many(self, keys):
+        """Fresh values among ``keys``, fetched in one pipelined round trip"""
+        keys = list(keys)
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.get(self._key(key))
+        try:
+            raws = pipe.execute()
+        except RedisError as e:
+            self._failed("get_many", e)
+            raws = [None] * len(keys)
+        found = {}
+        outcomes = {"hits": 0, "stale_hits": 0, "misses": 0}
+        for key, raw in zip(keys, raws):
+            value, stale, _, outcome = self._classify(key, raw)
+            outcomes[outcome] += 1
+            if value is not None and not stale:
+                found[key] = value
+        pipe = self.client.pipeline(transaction=False)
+        for outcome, amount in outcomes.items():
+            if amount:
+                self._count(pipe, outcome, amount)
+        try:
+            pipe.execute()
+        except RedisError as e:
+            self._failed("stats update", e)
+        return found
+
+    def peek(self, key):
+        """Like ``get`` but without touching the counters"""
+        try:
+            raw = self.client.get(self._key(key))
+        except RedisError as e:
+            self._failed("peek", e)
+            return None
+        if raw is None:
+            return None
+        value, expires_at = self._unpack(key, raw)
+        return None if self._clock() >= expires_at else value
+
+    def set(self, key, value, expires_at=None):
+        """Store ``value`` under ``key`` until ``expires_at`` (default: now + TTL)"""
+        if expires_at is None:
+            expires_at = self._clock() + self.default_ttl
+        raw = ENVELOPE.pack(expires_at) + self.encode(value)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.set(self._key(key), raw)
+        pipe.pexpireat(self._key(key), int((expires_at + self.max_stale) * 1000))
+        try:
+            pipe.execute()
+        except RedisError as e:
+            # The caller still has the value; other replicas just won't see it
+            self._failed("set", e)
+
+    def clear(self):
+        """Drop every key under the prefix and reset the counters"""
+        keys = list(self.client.scan_iter(match=f"{self.prefix}*"))
+        if keys:
+            self.client.delete(*keys)
+        with self._lock:
+            self._decoded.clear()
+            self.hits = self.stale_hits = self.misses = self.errors = 0
+            self.last_error = None
+
+    def stats(self):
+        """Counters of this replica and of every replica sharing the Redis server"""
+        try:
+            shared = {
+                (k.decode() if isinstance(k, bytes) else k): int(v)
+                for k, v in self.client.hgetall(self.stats_key).items()
+            }
+        except RedisError as e:
+            self._failed("stats", e)
+            shared = {}
+        shared_lookups = sum(shared.get(name, 0) for name in ("hits", "stale_hits", "misses"))
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "backend": "redis",
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+                "cluster_hit_ratio": round(
+                    (shared.get("hits", 0) + shared.get("stale_hits", 0)) / shared_lookups, 4
+                ) if shared_lookups else 0.0,
+            }
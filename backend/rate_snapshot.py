@@ -0,0 +1,103 @@
+"""Immutable, versioned rate snapshots published with a single reference swap"""
+import threading
+from collections import namedtuple
+
+RateSnapshot = namedtuple("RateSnapshot", ["version", "fetched_at", "expires_at", "table"])
+
+# Recent snapshots kept so /rates/delta can diff against them
+DEFAULT_HISTORY = 32
+
+
+def table_version(table):
+    """Version of a rate table: its fetch time in milliseconds.
+
+    Every worker holding the same table (shared cache, mmap snapshot) gives
+    it the same version, and a newer fetch always gets a higher one.
+    """
+    return round(table.fetched_at * 1000)
+
+
+class SnapshotRef:
+    """Holder of the current ``RateSnapshot``, updated RCU-style.
+
+    A snapshot is built completely before it is published, then made
+    current by rebinding one attribute. Readers call ``current()`` (a plain
+    attribute read, no lock) and keep that snapshot for the whole request,
+    so they see either the old table or the new one, never a mix. Versions
+    never decrease; the lock only serializes publishers. The last
+    ``history`` snapshots stay reachable through ``find()``, and
+    ``wait_newer()`` parks a caller until a newer version is published.
+    """
+
+    def __init__(self, history=DEFAULT_HISTORY):
+        self._current = None
+        # Immutable tuple, oldest first, rebound on publish like ``_current``
+        self._history = ()
+        self.history = history
+        self._lock = threading.Lock()
+        self._published = threading.Condition(self._lock)
+        self.publishes = 0
+
+    def current(self):
+        """The snapshot readers should use, or None before the first publish"""
+        return self._current
+
+    def find(self, version):
+        """The recent snapshot with ``version``, or None if unknown or evicted"""
+        for snapshot in reversed(self._history):
+            if snapshot.version == version:
+                return snapshot
+        return None
+
+    def wait_newer(self, version, timeout=None):
+        """Block until the current snapshot is newer than ``version``; it, or None on timeout"""
+        current = self._current
+        if current is not None and current.version > version:
+            return current
+
+        def newer():
+            return self._current is not None and self._current.version > version
+
+        with self._published:
+            self._published.wait_for(newer, timeout)
+            current = self._current
+        return current if current is not None and current.version > version else None
+
+    def publish(self, table, expires_at):
+        """Make ``table`` current and return its snapshot.
+
+        A table older than the current one (e.g. a slow refresh finishing
+        after a newer one) is not published; the current snapshot is
+        returned instead.
+        """
+        with self._lock:
+            current = self._current
+            if current is not None and table.fetched_at < current.fetched_at:
+                return current
+            snapshot = RateSnapshot(table_version(table), table.fetched_at, expires_at, table)
+            history = self._history
+            if history and history[-1].version == snapshot.version:
+                # Same table published again (e.g. new expiry): replace, don't duplicate
+                history = history[:-1]
+            self._history = (history + (snapshot,))[-self.history:]
+            self._current = snapshot
+            self.publishes += 1
+            self._published.notify_all()
+            return snapshot
+
+    def clear(self):
+        """Drop the current snapshot and the history"""
+        with self._lock:
+            self._current = None
+            self._history = ()
+
+    def stats(self):
+        """Snapshot metadata, suitable for JSON output"""
+        current = self._current
+        return {
+            "version": current.version if current is not None else None,
+            "fetched_at": current.fetched_at if current is not None else None,
+            "expires_at": current.expires_at if current is not None else None,
+            "publishes": self.publishes,
+            "history": len(self._history),
+        }
@@ -0,0 +1,146 @@
+"""Server-Sent Events fan-out of rate snapshots from a single asyncio loop"""
+import asyncio
+import json
+import threading
+
+from rate_snapshot import table_version
+
+# Comment line sent to idle clients, so dead connections are noticed on write
+KEEPALIVE = b": keepalive\n\n"
+
+
+def sse_frame(version, table):
+    """``rates`` event for ``table``: pivot rates as JSON, the version as event id"""
+    data = json.dumps(
+        {"version": version, "base": table.pivot, "conversion_rates": table.rates_for(table.pivot)},
+        separators=(",", ":"),
+    )
+    return f"id: {version}\nevent: rates\ndata: {data}\n\n".encode()
+
+
+class RateBroadcaster:
+    """Pushes each new rate table to every subscriber, encoded once.
+
+    Subscribers are coroutines on one event loop, run by a daemon thread
+    started with the first subscriber, so an idle connection costs a
+    suspended coroutine rather than a thread. All of them await the same
+    future; ``publish()`` encodes the frame in the caller and resolves that
+    future from the loop, waking everyone with the same bytes. ``stream()``
+    bridges ``updates()`` to a blocking iterator for WSGI responses.
+
+    ``poll`` (optional) is called every ``poll_interval`` seconds while
+    someone is subscribed, in the loop's executor, so tables loaded by
+    other workers or replicas reach this one's clients too.
+
+    Under the gevent worker (``gevent.monkey.patch_all()``) the loop thread
+    becomes a greenlet and its selector, locks and ``Future.result()`` are
+    the cooperative, patched versions: the loop yields to request greenlets
+    whenever it waits (see ``tests/test_gevent_worker.py``).
+    """
+
+    def __init__(self, poll=None, poll_interval=30.0, keepalive=15.0, name="rate-broadcaster"):
+        self.poll = poll
+        self.poll_interval = poll_interval
+        self.keepalive = keepalive
+        self.name = name
+        self._latest = None  # (version, frame)
+        self._next = None  # future resolved on the next publish, created in the loop
+        self._loop = None
+        self._lock = threading.Lock()
+        self.subscribers = 0
+        self.broadcasts = 0
+        self.poll_failures = 0
+        self.last_error = None
+
+    def publish(self, table):
+        """Broadcast ``table`` if it is newer than the last one, returns True if it was"""
+        version = table_version(table)
+        with self._lock:
+            latest = self._latest
+            if latest is not None and version <= latest[0]:
+                return False
+            self._latest = (version, sse_frame(version, table))
+            loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._wake)
+        return True
+
+    def _wake(self):
+        waiters, self._next = self._next, self._loop.create_future()
+        waiters.set_result(None)
+        self.broadcasts += 1
+
+    async def updates(self, last_version=None):
+        """SSE frames from the latest table on, keepalives in between (runs on the broadcaster's loop)"""
+        self.subscribers += 1
+        try:
+            while True:
+                # Checked before waiting: a publish between two waits is never missed
+                latest = self._latest
+                if latest is not None and latest[0] != last_version:
+                    last_version = latest[0]
+                    yield latest[1]
+                    continue
+                try:
+                    await asyncio.wait_for(asyncio.shield(self._next), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+        finally:
+            self.subscribers -= 1
+
+    def stream(self, last_version=None):
+        """Blocking iterator over ``updates()``, driven by the broadcaster's loop"""
+        loop = self._ensure_loop()
+        frames = self.updates(last_version)
+        try:
+            while True:
+                yield asyncio.run_coroutine_threadsafe(frames.__anext__(), loop).result()
+        finally:
+            asyncio.run_coroutine_threadsafe(frames.aclose(), loop)
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                thread = threading.Thread(target=self._run, args=(loop, ready), name=self.name, daemon=True)
+                thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def _run(self, loop, ready):
+        asyncio.set_event_loop(loop)
+        self._next = loop.create_future()
+        if self.poll is not None:
+            loop.create_task(self._poll_forever())
+        loop.call_soon(ready.set)
+        loop.run_forever()
+
+    async def _poll_forever(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if not self.subscribers:
+                continue
+            try:
+                await loop.run_in_executor(None, self.poll)
+            except Exception as e:
+                self.poll_failures += 1
+                self.last_error = str(e)
+
+    def clear(self):
+        """Forget the last table (the loop and its subscribers are kept)"""
+        with self._lock:
+            self._latest = None
+
+    def stats(self):
+        """Broadcaster counters, suitable for JSON output"""
+        latest = self._latest
+        return {
+            "version": latest[0] if latest is not None else None,
+            "subscribers": self.subscribers,
+            "broadcasts": self.broadcasts,
+            "poll_failures": self.poll_failures,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,67 @@
+"""Background refresh of stale rate tables"""
+import threading
+
+
+class RateRefresher:
+    """Single daemon thread that reloads rate tables off the request path.
+
+    ``refresh(key)`` only schedules the work and returns immediately;
+    scheduling a key that is already pending is a no-op. The thread is
+    started on first use and calls ``load(key)`` for each pending key.
+    """
+
+    def __init__(self, load, name="rate-refresher"):
+        self.load = load
+        self.name = name
+        self._pending = []
+        self._busy = False
+        self._thread = None
+        self._cond = threading.Condition()
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error = None
+
+    def refresh(self, key):
+        """Schedule a background reload of ``key``"""
+        with self._cond:
+            if key in self._pending:
+                return
+            self._pending.append(key)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._busy = False
+                    self._cond.notify_all()
+                    self._cond.wait()
+                key = self._pending.pop(0)
+                self._busy = True
+            try:
+                self.load(key)
+            except Exception as e:
+                with self._cond:
+                    self.failures += 1
+                    self.last_error = str(e)
+            else:
+                with self._cond:
+                    self.refreshes += 1
+
+    def wait_idle(self, timeout=None):
+        """Block until no refresh is pending or running; True if idle"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def stats(self):
+        """Snapshot of the refresher counters, suitable for JSON output"""
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "refreshes": self.refreshes,
+                "failures": self.failures,
+                "last_error": self.last_error,
+            }
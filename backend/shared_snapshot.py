@@ -0,0 +1,142 @@
+"""Rate snapshot shared by every worker process on a host through a memory-mapped file"""
+import mmap
+import os
+import struct
+import tempfile
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, refreshes are then not serialized across workers
+    fcntl = None
+
+import currencies
+from cross_rates import CrossRates
+
+MAGIC = b"RATESNP1"
+# magic, version, fetched_at, expires_at, pivot code, currency count
+HEADER = struct.Struct("<8sQdd3sxI")
+
+SharedEntry = namedtuple("SharedEntry", ["cross", "expires_at", "version"])
+
+
+def _aligned(size, alignment=8):
+    return (size + alignment - 1) // alignment * alignment
+
+
+class SharedRateSnapshot:
+    """Pivot rate table published once per host and mapped by every worker.
+
+    One worker fetches the upstream table and publishes it with
+    ``publish()``: the file is written next to ``path`` and atomically
+    renamed over it, with a version counter one above the previous one.
+    Readers ``mmap`` the current file and wrap the float64 section with
+    ``np.frombuffer``, so the rates are never copied into the worker.
+    ``refresh_lock()`` elects the single worker allowed to refresh.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self._mapped = None
+        self.reads = 0
+        self.remaps = 0
+        self.publishes = 0
+
+    def publish(self, cross, expires_at):
+        """Write ``cross`` as the new snapshot and return its version"""
+        current = self.read()
+        version = current.version + 1 if current is not None else 1
+        # Whole registry layout, so readers map the values without reindexing
+        codes = "".join(currencies.CODES_BY_INDEX).encode("ascii")
+        header = HEADER.pack(MAGIC, version, cross.fetched_at, expires_at,
+                             cross.pivot.encode("ascii"), currencies.SIZE)
+        padding = b"\0" * (_aligned(len(header) + len(codes)) - len(header) - len(codes))
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".rates-", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header)
+                f.write(codes)
+                f.write(padding)
+                f.write(memoryview(np.ascontiguousarray(cross.values, dtype="<f8")).cast("B"))
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self.publishes += 1
+        return version
+
+    def read(self):
+        """Current snapshot as a ``SharedEntry``, or None if nothing was published"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        self.reads += 1
+        key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        mapped = self._mapped
+        if mapped is None or mapped[0] != key:
+            # Swapped as one tuple so concurrent readers never pair a key with another entry
+            mapped = self._mapped = (key, self._map())
+            self.remaps += 1
+        return mapped[1]
+
+    def _map(self):
+        with open(self.path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, fetched_at, expires_at, pivot, count = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a rate snapshot")
+        codes_end = HEADER.size + 3 * count
+        raw_codes = mm[HEADER.size:codes_end].decode("ascii")
+        codes = tuple(raw_codes[i:i + 3] for i in range(0, len(raw_codes), 3))
+        values = np.frombuffer(mm, dtype="<f8", count=count, offset=_aligned(codes_end))
+        cross = CrossRates.from_arrays(pivot.decode("ascii"), codes, values, fetched_at=fetched_at)
+        return SharedEntry(cross, expires_at, version)
+
+    def is_fresh(self, entry, now=None):
+        """True if ``entry`` has not reached the upstream's next update time"""
+        now = time.time() if now is None else now
+        return entry is not None and now < entry.expires_at
+
+    @contextmanager
+    def refresh_lock(self, timeout=10.0, poll=0.05):
+        """Hold the host-wide refresh lock; yields False if it timed out"""
+        if fcntl is None:
+            yield True
+            return
+        with open(self.lock_path, "a+") as lock_file:
+            deadline = time.monotonic() + timeout
+            acquired = False
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    acquired = True
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        break
+                    time.sleep(poll)
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def stats(self):
+        """Snapshot of the shared file counters, suitable for JSON output"""
+        mapped = self._mapped
+        return {
+            "path": self.path,
+            "version": mapped[1].version if mapped is not None else None,
+            "reads": self.reads,
+            "remaps": self.remaps,
+            "publishes": self.publishes,
+        }
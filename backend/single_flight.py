@@ -0,0 +1,84 @@
+"""Request coalescing: one upstream call per key, however many callers miss at once"""
+import threading
+
+
+class SingleFlightTimeout(TimeoutError):
+    """Raised to a caller that waited too long on another caller's fetch"""
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "served")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.served = 1
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into a single execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait (at most ``wait_timeout`` seconds) and receive the same
+    result or exception. ``on_flight(key, served)`` is called after each
+    execution with the number of callers it served.
+    """
+
+    def __init__(self, wait_timeout=10.0, on_flight=None):
+        self.wait_timeout = wait_timeout
+        self.on_flight = on_flight
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.flights = 0
+        self.coalesced = 0
+        self.max_served = 0
+        self.timeouts = 0
+
+    def do(self, key, fn):
+        """Run ``fn()`` for ``key`` unless a call is already in flight, then share its outcome"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.served += 1
+                self.coalesced += 1
+        if not leader:
+            return self._wait(key, call)
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self.flights += 1
+                self.max_served = max(self.max_served, call.served)
+            call.done.set()
+            if self.on_flight is not None:
+                self.on_flight(key, call.served)
+        return call.result
+
+    def _wait(self, key, call):
+        if not call.done.wait(self.wait_timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise SingleFlightTimeout(f"Timed out waiting for in-flight fetch of {key}")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        """Snapshot of the coalescing counters, suitable for JSON output"""
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "flights": self.flights,
+                "coalesced": self.coalesced,
+                "max_served": self.max_served,
+                "timeouts": self.timeouts,
+            }
@@ -0,0 +1,146 @@
+"""Durable history of fetched rate tables in MongoDB"""
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from pymongo import ASCENDING, DESCENDING, InsertOne
+
+from cross_rates import CrossRates
+
+
+def _to_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+def _to_timestamp(value):
+    # pymongo returns naive UTC datetimes unless the client is tz_aware
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class RateArchive:
+    """Write every fetched pivot table to MongoDB without blocking requests.
+
+    ``record()`` only enqueues the snapshot; a daemon thread drains the
+    queue and writes up to ``batch_size`` documents per ``bulk_write``,
+    waiting at most ``flush_interval`` seconds for a batch to fill. Reads
+    (``latest``, ``history``) use the ``(base, fetched_at)`` index.
+
+    After a failed read or write the archive reports itself unavailable
+    for ``retry_interval`` seconds, so callers can skip it instead of
+    waiting on the server selection timeout again.
+    """
+
+    def __init__(self, collection, batch_size=100, flush_interval=1.0, max_queue=10000,
+                 retry_interval=60.0, clock=time.monotonic):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self._clock = clock
+        self._retry_at = 0.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failures = 0
+        self.last_error = None
+
+    def ensure_indexes(self):
+        """Create the compound index used by every history query"""
+        self.collection.create_index([("base", ASCENDING), ("fetched_at", DESCENDING)])
+
+    def record(self, cross, expires_at):
+        """Queue ``cross`` for archiving; drops it if the writer is too far behind"""
+        document = {
+            "base": cross.pivot,
+            "fetched_at": _to_datetime(cross.fetched_at),
+            "expires_at": _to_datetime(expires_at),
+            "rates": dict(zip(cross.codes, cross.pivot_values().tolist())),
+        }
+        try:
+            self._queue.put_nowait(document)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="rate-archive", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self.collection.bulk_write([InsertOne(doc) for doc in batch], ordered=False)
+            except Exception as e:
+                self._failed(e)
+            else:
+                with self._lock:
+                    self.written += len(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _failed(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            self._retry_at = self._clock() + self.retry_interval
+
+    def available(self):
+        """False for ``retry_interval`` seconds after a failed read or write"""
+        return self._clock() >= self._retry_at
+
+    def flush(self):
+        """Block until every queued snapshot has been written (or failed)"""
+        self._queue.join()
+
+    def latest(self, base):
+        """Most recent archived table for ``base`` as ``(cross, expires_at)``, or None"""
+        try:
+            document = self.collection.find_one({"base": base}, sort=[("fetched_at", DESCENDING)])
+        except Exception as e:
+            self._failed(e)
+            raise
+        if document is None:
+            return None
+        cross = CrossRates(document["base"], document["rates"],
+                           fetched_at=_to_timestamp(document["fetched_at"]))
+        return cross, _to_timestamp(document["expires_at"])
+
+    def history(self, base, limit=24, since=None):
+        """Archived tables for ``base``, newest first"""
+        query = {"base": base}
+        if since is not None:
+            query["fetched_at"] = {"$gte": _to_datetime(since)}
+        cursor = self.collection.find(query, {"_id": 0}).sort("fetched_at", DESCENDING).limit(limit)
+        return [
+            CrossRates(doc["base"], doc["rates"], fetched_at=_to_timestamp(doc["fetched_at"]))
+            for doc in cursor
+        ]
+
+    def stats(self):
+        """Snapshot of the archive counters, suitable for JSON output"""
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "failures": self.failures,
+                "last_error": self.last_error,
+                "available": self._clock() >= self._retry_at,
+            }
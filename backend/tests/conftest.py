@@ -2,6 +2,8 @@
 import pytest
 import sys
 import os
+import time
+from unittest.mock import Mock
 
 # Set environment variable for tests
 os.environ['EXCHANGE_API_KEY'] = 'test-api-key-for-ci'
@@ -11,6 +13,17 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 # Import app - prometheus should be available via requirements.txt
 from app import app as flask_app
+from cross_rates import CrossRates
+
+
+class FakeClock:
+    """Horloge réglable à la main, à passer en ``clock=`` aux caches et disjoncteurs"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
 
 
 @pytest.fixture
@@ -25,6 +38,24 @@ def app():
     yield flask_app
 
 
+@pytest.fixture(autouse=True)
+def reset_rate_cache():
+    """
+    Vide le cache des taux entre les tests pour que chaque mock soit utilisé
+    """
+    from app import rate_cache, rate_refresher, upstream_breaker, rate_snapshot, rate_broadcaster
+    rate_cache.clear()
+    rate_snapshot.clear()
+    rate_broadcaster.clear()
+    upstream_breaker.reset()
+    yield
+    rate_refresher.wait_idle(timeout=5)
+    rate_cache.clear()
+    rate_snapshot.clear()
+    rate_broadcaster.clear()
+    upstream_breaker.reset()
+
+
 @pytest.fixture
 def client(app):
     """
@@ -40,3 +71,49 @@ def runner(app):
     Fixture pour tester les commandes CLI (optionnel)
     """
     return app.test_cli_runner()
+
+
+@pytest.fixture
+def fake_clock():
+    """
+    Horloge figée à t=1000, avancée par le test via ``fake_clock.now``
+    """
+    return FakeClock()
+
+
+@pytest.fixture
+def rate_table():
+    """
+    Fabrique de tables USD/EUR : ``rate_table(eur, fetched_at)``
+    """
+    def make(eur, fetched_at):
+        return CrossRates('USD', {'USD': 1, 'EUR': eur}, fetched_at=fetched_at)
+    return make
+
+
+@pytest.fixture
+def latest_response():
+    """
+    Fabrique de réponses ``latest`` de l'API amont, à passer à ``patch('requests.Session.get')``
+    """
+    def make(rates, **extra):
+        mock_response = Mock()
+        payload = {'result': 'success', 'base_code': 'USD', 'conversion_rates': rates}
+        payload.update(extra)
+        mock_response.json.return_value = payload
+        return mock_response
+    return make
+
+
+@pytest.fixture
+def cache_rates():
+    """
+    Publie une table de taux USD dans le cache du service : ``cache_rates(rates, ttl=60)``
+    """
+    from app import cache_cross_rates
+
+    def cache(rates, ttl=60):
+        cross = CrossRates('USD', rates)
+        cache_cross_rates(cross, time.time() + ttl)
+        return cross
+    return cache
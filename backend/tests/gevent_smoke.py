@@ -0,0 +1,66 @@
+"""Script lancé par test_gevent_worker.py : l'application sous gevent.monkey.patch_all().
+
+Le broadcaster asyncio de /rates/stream tourne alors dans une greenlet et
+les attentes de /rates/wait sur des Condition patchées : 200 long polls et
+20 flux restent parqués sans bloquer /health, puis une seule publication
+les réveille tous.
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import http.client  # noqa: E402
+import json  # noqa: E402
+import time  # noqa: E402
+
+import gevent  # noqa: E402
+from gevent.pywsgi import WSGIServer  # noqa: E402
+
+import app  # noqa: E402
+from cross_rates import CrossRates  # noqa: E402
+
+WAITERS = 200
+STREAMS = 20
+
+
+def main():
+    now = time.time()
+    app.cache_cross_rates(CrossRates('USD', {'USD': 1, 'EUR': 0.5}, fetched_at=now - 10), now + 600)
+    version = app.rate_snapshot.current().version
+    server = WSGIServer(('127.0.0.1', 0), app.app, log=None)
+    server.start()
+
+    def get(path, headers=None):
+        conn = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=20)
+        conn.request('GET', path, headers=headers or {})
+        return conn.getresponse()
+
+    def wait():
+        response = get(f'/rates/wait?version={version}&timeout=15')
+        return response.status, json.loads(response.read())
+
+    def stream():
+        response = get('/rates/stream', {'Last-Event-ID': str(version)})
+        data = b''
+        while b'event: rates' not in data:
+            data += response.read1(4096)
+        return data
+
+    waiters = [gevent.spawn(wait) for _ in range(WAITERS)]
+    streams = [gevent.spawn(stream) for _ in range(STREAMS)]
+    gevent.sleep(0.5)
+    assert not any(g.ready() for g in waiters + streams), 'parked requests returned early'
+    started = time.monotonic()
+    assert get('/health').status == 200
+    assert time.monotonic() - started < 1, 'health blocked by parked requests'
+
+    app.cache_cross_rates(CrossRates('USD', {'USD': 1, 'EUR': 0.6}, fetched_at=now), now + 600)
+    gevent.joinall(waiters + streams, timeout=10, raise_error=True)
+    assert all(g.successful() for g in waiters + streams), 'parked requests not woken'
+    assert all(g.value[0] == 200 and g.value[1]['conversion_rates']['EUR'] == 0.6 for g in waiters)
+    assert all(b'"EUR":0.6' in g.value for g in streams)
+    server.stop()
+    print(f'ok {WAITERS} waiters {STREAMS} streams')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Tests de la conversion en flux de fichiers CSV / NDJSON"""
+import io
+import json
+import pytest
+
+from bulk_convert import BulkConverter, chunked, main
+from cross_rates import CrossRates
+
+RATES = {'USD': 1, 'EUR': 0.5, 'GBP': 0.25}
+
+
+@pytest.fixture
+def cached_rates(cache_rates):
+    return cache_rates(RATES)
+
+
+def test_chunked_is_lazy():
+    def rows():
+        yield from range(5)
+        raise AssertionError("read past the first chunk")
+
+    assert next(chunked(rows(), 3)) == [0, 1, 2]
+
+
+def test_csv_appends_converted_column_per_chunk():
+    converter = BulkConverter(CrossRates('USD', RATES), 'EUR', chunk_size=2)
+    lines = io.StringIO("id,currency,amount\n1,USD,10\n2,GBP,1\n3,XXX,5\n4,USD,abc\n")
+
+    chunks = list(converter.csv(lines))
+
+    assert len(chunks) == 3  # header + 2 chunks of 2 rows
+    assert ''.join(chunks).splitlines() == [
+        'id,currency,amount,converted_amount',
+        '1,USD,10,5.0',
+        '2,GBP,1,2.0',
+        '3,XXX,5,',
+        '4,USD,abc,',
+    ]
+    assert (converter.rows, converter.errors) == (4, 2)
+
+
+def test_convert_stream_endpoint_ndjson(client, cached_rates):
+    body = '{"currency": "EUR", "amount": 3}\nnot json\n{"amount": 2}\n'
+    response = client.post('/convert/stream?to=GBP&format=ndjson', data=body,
+                           content_type='application/x-ndjson')
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert records[0]['converted_amount'] == pytest.approx(1.5)
+    assert 'error' in records[1]
+    assert records[2]['converted_amount'] is None
+
+
+def test_convert_stream_endpoint_fixed_source(client, cached_rates):
+    response = client.post('/convert/stream?to=EUR&from=USD', data='amount\n4\n', content_type='text/csv')
+
+    assert response.get_data(as_text=True) == 'amount,converted_amount\n4,2.0\n'
+
+
+def test_convert_stream_rejects_unknown_target(client, cached_rates):
+    response = client.post('/convert/stream?to=XXX', data='amount\n1\n', content_type='text/csv')
+
+    assert response.status_code == 400
+
+
+def test_cli_uses_service_rate_cache(cached_rates, tmp_path, capsys):
+    ledger = tmp_path / 'ledger.csv'
+    ledger.write_text('currency,amount\nEUR,1\n')
+
+    assert main([str(ledger), '--to', 'USD']) == 0
+    assert capsys.readouterr().out == 'currency,amount,converted_amount\nEUR,1,2.0\n'
+
+
+def test_overflowing_rows_are_not_converted():
+    converter = BulkConverter(CrossRates('USD', {'USD': 1, 'IRR': 42000}), 'IRR')
+    lines = io.StringIO('{"currency": "USD", "amount": 1e308}\n{"currency": "USD", "amount": 2}\n')
+
+    out = [json.loads(line) for line in ''.join(converter.ndjson(lines)).splitlines()]
+
+    assert [row['converted_amount'] for row in out] == [None, 84000.0]
+    assert converter.errors == 1
@@ -0,0 +1,164 @@
+"""Tests des backends de cache (mémoire et protocole Redis via fakeredis)"""
+import time
+import pytest
+import fakeredis
+from unittest.mock import patch, Mock
+
+from cross_rates import CrossRates
+from rate_cache import RateCache, RedisRateCache
+
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+
+def _replica(server, clock=None, max_stale=0):
+    return RedisRateCache(
+        fakeredis.FakeRedis(server=server),
+        encode=CrossRates.to_bytes,
+        decode=CrossRates.from_bytes,
+        default_ttl=60,
+        max_stale=max_stale,
+        clock=clock or time.time,
+    )
+
+
+def test_redis_roundtrip_between_replicas(redis_server):
+    writer, reader = _replica(redis_server), _replica(redis_server)
+    writer.set('USD', CrossRates('USD', {'USD': 1, 'EUR': 0.5}))
+
+    cross = reader.get('USD')
+    assert cross.rate('USD', 'EUR') == pytest.approx(0.5)
+    # The decoded table is reused while the stored payload is unchanged
+    assert reader.get('USD') is cross
+
+
+def test_redis_stale_window_and_key_ttl(redis_server, fake_clock):
+    clock = fake_clock
+    clock.now = time.time()
+    cache = _replica(redis_server, clock=clock, max_stale=30)
+    cache.set('USD', CrossRates('USD', {'USD': 1, 'EUR': 0.5}), expires_at=clock.now + 60)
+
+    ttl_ms = cache.client.pttl('currency-converter:rates:USD')
+    assert 85_000 < ttl_ms <= 90_000
+
+    clock.now += 70
+    value, stale = cache.lookup('USD')
+    assert stale and value is not None
+    assert cache.get('USD') is None
+    assert cache.peek('USD') is None
+
+
+def test_redis_get_many_is_pipelined(redis_server):
+    cache = _replica(redis_server)
+    cache.set('USD', CrossRates('USD', {'USD': 1, 'EUR': 0.5}))
+    cache.set('EUR', CrossRates('EUR', {'EUR': 1, 'USD': 2.0}))
+
+    with patch.object(cache.client, 'get', side_effect=AssertionError('not pipelined')):
+        found = cache.get_many(['USD', 'EUR', 'GBP'])
+
+    assert sorted(found) == ['EUR', 'USD']
+    assert cache.stats()['misses'] == 1
+
+
+def test_cluster_hit_ratio_across_replicas(redis_server):
+    first, second = _replica(redis_server), _replica(redis_server)
+    assert first.get('USD') is None
+    first.set('USD', CrossRates('USD', {'USD': 1, 'EUR': 0.5}))
+    for _ in range(3):
+        assert second.get('USD') is not None
+
+    assert first.stats()['hit_ratio'] == 0.0
+    assert second.stats()['hit_ratio'] == 1.0
+    assert second.stats()['cluster_hit_ratio'] == 0.75
+
+
+def test_redis_clear(redis_server):
+    cache = _replica(redis_server)
+    cache.set('USD', CrossRates('USD', {'USD': 1, 'EUR': 0.5}))
+    cache.clear()
+    assert cache.get('USD') is None
+
+
+def test_memory_backend_get_many():
+    cache = RateCache(default_ttl=60)
+    cache.set('USD', 1)
+    assert cache.get_many(['USD', 'EUR']) == {'USD': 1}
+    assert cache.stats()['backend'] == 'memory'
+
+
+def test_app_with_redis_backend(client, monkeypatch, redis_server):
+    import app
+    monkeypatch.setattr(app, 'rate_cache', _replica(redis_server))
+    mock_response = Mock()
+    mock_response.json.return_value = {'result': 'success', 'conversion_rates': {'USD': 1, 'EUR': 0.5}}
+
+    with patch('requests.Session.get', return_value=mock_response) as upstream:
+        client.get('/rates')
+        # Another replica with its own client on the same server
+        monkeypatch.setattr(app, 'rate_cache', _replica(redis_server))
+        app.rate_snapshot.clear()
+        response = client.get('/convert?from=EUR&to=USD&amount=3')
+
+    assert upstream.call_count == 1
+    assert response.get_json()['converted'] == pytest.approx(6.0)
+    assert client.get('/health').get_json()['cache']['cluster_hit_ratio'] == 0.5
+
+
+def test_redis_down_is_a_counted_miss(redis_server):
+    cache = _replica(redis_server)
+    cache.set('USD', CrossRates('USD', {'USD': 1, 'EUR': 0.5}))
+    redis_server.connected = False
+
+    assert cache.lookup('USD') == (None, False)
+    assert cache.peek('USD') is None
+    assert cache.get_many(['USD']) == {}
+    cache.set('USD', CrossRates('USD', {'USD': 1, 'EUR': 0.6}))
+
+    stats = cache.stats()
+    assert stats['errors'] >= 4
+    assert stats['misses'] == 2
+    assert 'onnect' in stats['last_error']
+
+
+def test_app_survives_redis_outage(client, monkeypatch, redis_server):
+    import app
+    monkeypatch.setattr(app, 'rate_cache', _replica(redis_server))
+    redis_server.connected = False
+    mock_response = Mock()
+    mock_response.json.return_value = {'result': 'success', 'conversion_rates': {'USD': 1, 'EUR': 0.5}}
+
+    with patch('requests.Session.get', return_value=mock_response) as upstream:
+        response = client.get('/convert?from=USD&to=EUR&amount=2')
+        second = client.get('/rates')
+
+    assert response.status_code == 200
+    assert response.get_json()['converted'] == pytest.approx(1.0)
+    assert second.status_code == 200
+    # The fetched table was published despite the failed cache write
+    assert upstream.call_count == 1
+    assert app.rate_snapshot.current().table.rate('USD', 'EUR') == pytest.approx(0.5)
+    assert client.get('/health').get_json()['cache']['errors'] > 0
+
+
+def test_table_refreshed_by_another_replica_becomes_the_snapshot(client, monkeypatch, redis_server):
+    import app
+    other = _replica(redis_server)
+    other.set('USD', CrossRates('USD', {'USD': 1, 'EUR': 0.5}, fetched_at=time.time()), expires_at=time.time() + 600)
+    cache = _replica(redis_server)
+    monkeypatch.setattr(app, 'rate_cache', cache)
+
+    with patch('requests.Session.get') as upstream:
+        first = client.get('/rates')
+        with patch.object(cache.client, 'get', wraps=cache.client.get) as redis_get:
+            second = client.get('/rates')
+
+    assert upstream.call_count == 0
+    assert app.rate_snapshot.current().table.rate('USD', 'EUR') == pytest.approx(0.5)
+    # Pushed to /rates/stream clients (and /rates/wait waiters) of this replica too
+    assert app.rate_broadcaster.stats()['version'] == app.rate_snapshot.current().version
+    # Served from the local snapshot with a lifetime, not revalidated on every request
+    assert redis_get.call_count == 0
+    assert first.cache_control.max_age > 500 and not first.cache_control.no_cache
+    assert second.cache_control.max_age > 500
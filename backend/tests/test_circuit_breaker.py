@@ -0,0 +1,122 @@
+"""Tests du disjoncteur autour du fournisseur de taux"""
+import time
+import pytest
+from unittest.mock import patch, Mock
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, HALF_OPEN, OPEN
+
+
+def _fail():
+    raise ConnectionError('upstream down')
+
+
+def _trip(breaker, failures):
+    for _ in range(failures):
+        with pytest.raises(ConnectionError):
+            breaker.call(_fail)
+
+
+def test_opens_after_threshold_and_fails_fast(fake_clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=fake_clock)
+    _trip(breaker, 3)
+    assert breaker.state == OPEN
+
+    called = []
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.call(called.append, 1)
+    assert called == []
+    assert error.value.retry_after == 30
+    assert breaker.stats()['rejected'] == 1
+
+
+def test_success_resets_failure_count(fake_clock):
+    breaker = CircuitBreaker(failure_threshold=2, clock=fake_clock)
+    _trip(breaker, 1)
+    assert breaker.call(lambda: 'ok') == 'ok'
+    _trip(breaker, 1)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_closes_or_reopens(fake_clock):
+    clock = fake_clock
+    states = []
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock,
+                             on_change=lambda state, failures: states.append(state))
+    _trip(breaker, 1)
+
+    clock.now += 11
+    _trip(breaker, 1)
+    assert breaker.state == OPEN
+
+    clock.now += 11
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CLOSED
+    assert states == [OPEN, HALF_OPEN, OPEN, HALF_OPEN, CLOSED]
+
+
+def test_only_one_half_open_probe(fake_clock):
+    clock = fake_clock
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    _trip(breaker, 1)
+    clock.now += 11
+
+    def probe():
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: 'concurrent')
+        return 'probe'
+
+    assert breaker.call(probe) == 'probe'
+
+
+def test_open_circuit_returns_503_without_upstream_call(client):
+    from app import upstream_breaker
+    with patch('requests.Session.get', side_effect=ConnectionError('timeout')) as upstream:
+        for _ in range(upstream_breaker.failure_threshold):
+            assert client.get('/rates').status_code == 500
+        response = client.get('/convert?from=USD&to=EUR&amount=1')
+
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
+    assert upstream.call_count == upstream_breaker.failure_threshold
+    assert upstream_breaker.stats()['state'] == OPEN
+
+
+def test_provider_error_payloads_trip_the_breaker(client):
+    from app import upstream_breaker
+    quota = Mock(status_code=429)
+    quota.json.return_value = {'result': 'error', 'error-type': 'quota-reached'}
+    with patch('requests.Session.get', return_value=quota) as upstream:
+        statuses = [client.get('/rates').status_code for _ in range(10)]
+
+    assert statuses[:upstream_breaker.failure_threshold] == [502] * upstream_breaker.failure_threshold
+    assert set(statuses[upstream_breaker.failure_threshold:]) == {503}
+    assert upstream.call_count == upstream_breaker.failure_threshold
+    assert upstream_breaker.stats()['state'] == OPEN
+
+
+def test_last_known_good_served_when_upstream_fails(client):
+    from app import rate_cache, rate_snapshot
+    mock_response = Mock()
+    mock_response.json.return_value = {'result': 'success', 'conversion_rates': {'USD': 1, 'EUR': 0.5}}
+    with patch('requests.Session.get', return_value=mock_response):
+        client.get('/rates')
+
+    # The table expires and drops out of the cache; the snapshot keeps it as last known good
+    rate_cache.clear()
+    rate_snapshot.publish(rate_snapshot.current().table, expires_at=time.time() - 1)
+    with patch('requests.Session.get', side_effect=ConnectionError('timeout')):
+        response = client.get('/rates?base=EUR')
+
+    assert response.status_code == 200
+    assert response.headers['X-Rates-Stale'] == 'true'
+    assert response.get_json()['conversion_rates']['USD'] == pytest.approx(2.0)
+
+
+def test_breaker_state_exported_to_prometheus(client):
+    from app import upstream_breaker
+    with patch('requests.Session.get', side_effect=ConnectionError('timeout')):
+        for _ in range(upstream_breaker.failure_threshold):
+            client.get('/rates')
+
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'currency_converter_upstream_circuit_state 2.0' in body
@@ -0,0 +1,128 @@
+"""Tests de /convert servi depuis les tables de taux en cache"""
+import pytest
+from unittest.mock import patch, Mock
+
+
+def _upstream(latest_rates=None, pair=None):
+    """Simule l'API amont: réponses différentes pour /latest et /pair"""
+    def fake_get(url, **kwargs):
+        response = Mock()
+        if '/latest/' in url:
+            response.json.return_value = {
+                'result': 'success',
+                'base_code': url.rsplit('/', 1)[-1],
+                'conversion_rates': latest_rates or {},
+            }
+        else:
+            response.json.return_value = pair or {}
+        return response
+    return fake_get
+
+
+def test_convert_uses_cached_latest_table(client):
+    rates = {'USD': 1.0, 'EUR': 0.5, 'GBP': 0.25}
+    with patch('requests.Session.get', side_effect=_upstream(rates)) as upstream:
+        first = client.get('/convert?from=USD&to=EUR&amount=10')
+        second = client.get('/convert?from=USD&to=GBP&amount=3')
+
+    assert first.get_json()['converted'] == pytest.approx(5.0)
+    assert first.get_json()['rate'] == pytest.approx(0.5)
+    assert second.get_json()['converted'] == pytest.approx(0.75)
+    # One /latest fetch serves every amount and target
+    assert upstream.call_count == 1
+    assert all('/latest/' in call.args[0] for call in upstream.call_args_list)
+
+
+def test_convert_shares_cache_with_rates(client):
+    rates = {'USD': 1.0, 'EUR': 0.5}
+    with patch('requests.Session.get', side_effect=_upstream(rates)) as upstream:
+        client.get('/rates?base=USD')
+        response = client.get('/convert?from=USD&to=EUR&amount=4')
+
+    assert response.get_json()['converted'] == pytest.approx(2.0)
+    assert upstream.call_count == 1
+
+
+def test_convert_falls_back_to_pair_for_currency_missing_from_table(client):
+    rates = {'USD': 1.0, 'EUR': 0.5}
+    pair = {'result': 'success', 'conversion_rate': 3.0, 'conversion_result': 30.0}
+    with patch('requests.Session.get', side_effect=_upstream(rates, pair)) as upstream:
+        response = client.get('/convert?from=USD&to=GBP&amount=10')
+
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['converted'] == 30.0
+    assert data['rate'] == 3.0
+    assert '/pair/USD/GBP/10.0' in upstream.call_args_list[-1].args[0]
+
+
+def test_convert_multiple_targets_from_one_table(client):
+    rates = {'USD': 1.0, 'EUR': 0.5, 'GBP': 0.25, 'JPY': 150.0}
+    with patch('requests.Session.get', side_effect=_upstream(rates)) as upstream:
+        response = client.get('/convert?from=EUR&to=USD,GBP,JPY,GBP&amount=2')
+
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['to'] == ['USD', 'GBP', 'JPY']
+    assert data['converted'] == pytest.approx({'USD': 4.0, 'GBP': 1.0, 'JPY': 600.0})
+    assert data['rates']['JPY'] == pytest.approx(300.0)
+    assert upstream.call_count == 1
+
+
+def test_convert_rejects_unknown_codes(client):
+    rates = {'USD': 1.0, 'EUR': 0.5}
+    with patch('requests.Session.get', side_effect=_upstream(rates)) as upstream:
+        multi = client.get('/convert?from=USD&to=EUR,GBP&amount=1')
+        malformed = client.get('/convert?from=usd&to=EUR&amount=1')
+
+    assert multi.status_code == 400
+    assert 'GBP' in multi.get_json()['message']
+    assert malformed.status_code == 400
+    # No /pair fallback for a multi-target or malformed request
+    assert upstream.call_count == 1
+
+
+def test_convert_rejects_unregistered_codes_before_any_io(client):
+    with patch('requests.Session.get') as upstream:
+        responses = [
+            client.get('/convert?from=USD&to=ZZZ&amount=1'),
+            client.get('/convert?from=ABC&to=EUR,GBP&amount=1'),
+            client.get('/rates?base=ZZZ'),
+            client.get('/matrix?symbols=USD,ABC'),
+        ]
+
+    assert [r.status_code for r in responses] == [400] * 4
+    assert 'ABC' in responses[1].get_json()['message']
+    upstream.assert_not_called()
+
+
+@pytest.mark.parametrize('amount', ['nan', 'inf', '-inf', 'NaN', 'Infinity'])
+def test_convert_rejects_non_finite_amount(client, amount):
+    with patch('requests.Session.get', side_effect=_upstream({'USD': 1.0, 'EUR': 0.5})) as upstream:
+        response = client.get(f'/convert?from=USD&to=EUR&amount={amount}')
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Amount must be positive.'
+    upstream.assert_not_called()
+
+
+def test_convert_rejects_amount_overflowing_the_result(client):
+    with patch('requests.Session.get', side_effect=_upstream({'USD': 1.0, 'JPY': 150.0})):
+        response = client.get('/convert?from=USD&to=JPY&amount=1e307')
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Amount too large.'
+
+
+@pytest.mark.parametrize('amount, message', [
+    ('inf', 'Amount must be positive.'),
+    ('nan', 'Amount must be positive.'),
+    ('1e307', 'Amount too large.'),
+])
+def test_convert_multiple_targets_rejects_non_finite_results(client, amount, message):
+    rates = {'USD': 1.0, 'EUR': 0.5, 'JPY': 150.0}
+    with patch('requests.Session.get', side_effect=_upstream(rates)):
+        response = client.get(f'/convert?from=USD&to=EUR,JPY&amount={amount}')
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == message
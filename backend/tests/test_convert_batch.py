@@ -0,0 +1,90 @@
+"""Tests de l'endpoint de conversion par lot POST /convert/batch"""
+import pytest
+from unittest.mock import patch, Mock
+
+
+@pytest.fixture
+def cached_rates(cache_rates):
+    return cache_rates({'USD': 1, 'EUR': 0.5, 'GBP': 0.25, 'JPY': 150.0})
+
+
+def test_batch_converts_in_order(client, cached_rates):
+    items = [
+        {'from': 'USD', 'to': 'EUR', 'amount': 10},
+        {'from': 'EUR', 'to': 'GBP', 'amount': 4},
+        {'from': 'JPY', 'to': 'USD', 'amount': 300},
+    ]
+    response = client.post('/convert/batch', json=items)
+
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['count'] == 3
+    assert data['errors'] == 0
+    assert [r['converted'] for r in data['results']] == pytest.approx([5.0, 2.0, 2.0])
+    assert data['results'][1]['rate'] == pytest.approx(0.5)
+    assert 'X-Rates-Age' in response.headers
+
+
+def test_batch_reports_per_item_errors(client, cached_rates):
+    items = [
+        {'from': 'USD', 'to': 'EUR', 'amount': 1},
+        {'from': 'usd', 'to': 'EUR', 'amount': 1},
+        {'from': 'USD', 'to': 'XAU', 'amount': 1},
+        {'from': 'USD', 'to': 'EUR', 'amount': -5},
+        {'from': 'USD', 'to': 'EUR', 'amount': 'ten'},
+        'not an object',
+    ]
+    data = client.post('/convert/batch', json=items).get_json()
+
+    assert data['errors'] == 5
+    assert [r['status'] for r in data['results']] == ['success'] + ['error'] * 5
+    assert 'Unsupported' in data['results'][2]['message']
+
+
+def test_batch_is_csrf_exempt_and_needs_array(client, cached_rates):
+    # CSRF protection is active outside of TESTING: the exemption must hold
+    from app import app
+    app.config['WTF_CSRF_CHECK_DEFAULT'] = True
+    response = client.post('/convert/batch', json={'from': 'USD'})
+    assert response.status_code == 400
+    assert 'JSON array' in response.get_json()['message']
+
+
+def test_batch_uses_one_upstream_fetch(client):
+    mock_response = Mock()
+    mock_response.json.return_value = {'result': 'success', 'conversion_rates': {'USD': 1, 'EUR': 0.5}}
+    items = [{'from': 'EUR', 'to': 'USD', 'amount': i + 1} for i in range(1000)]
+    with patch('requests.Session.get', return_value=mock_response) as upstream:
+        data = client.post('/convert/batch', json=items).get_json()
+
+    assert upstream.call_count == 1
+    assert data['results'][-1]['converted'] == pytest.approx(2000.0)
+
+
+def test_batch_size_limit(client, cached_rates, monkeypatch):
+    import app
+    monkeypatch.setattr(app, 'BATCH_MAX_ITEMS', 2)
+    response = client.post('/convert/batch', json=[{'from': 'USD', 'to': 'EUR', 'amount': 1}] * 3)
+    assert response.status_code == 413
+
+
+def test_batch_overflow_is_a_per_item_error(client, cached_rates):
+    items = [{'from': 'USD', 'to': 'JPY', 'amount': 1e307}, {'from': 'USD', 'to': 'EUR', 'amount': 2}]
+    response = client.post('/convert/batch', json=items)
+
+    # Strict JSON: no Infinity anywhere in the body
+    assert b'Infinity' not in response.data
+    data = response.get_json()
+    assert data['errors'] == 1
+    assert data['results'][0] == {'status': 'error', 'message': 'Amount too large.'}
+    assert data['results'][1]['converted'] == pytest.approx(1.0)
+
+
+def test_batch_huge_integer_amount_is_a_per_item_error(client, cached_rates):
+    items = [{'from': 'USD', 'to': 'EUR', 'amount': 10 ** 400}, {'from': 'USD', 'to': 'EUR', 'amount': 2}]
+    response = client.post('/convert/batch', json=items)
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['results'][0] == {'status': 'error', 'message': 'Amount too large.'}
+    assert data['results'][1]['converted'] == pytest.approx(1.0)
@@ -51,7 +51,7 @@ def test_convert_with_mock(client):
         "conversion_rate": 0.925
     }
     
-    with patch('app.requests.get', return_value=mock_response):
+    with patch('requests.Session.get', return_value=mock_response):
         response = client.get('/convert?from=USD&to=EUR&amount=100')
         assert response.status_code == 200
         data = json.loads(response.data)
@@ -68,7 +68,7 @@ def test_rates_with_mock(client):
         "conversion_rates": {"EUR": 0.925, "GBP": 0.79}
     }
     
-    with patch('app.requests.get', return_value=mock_response):
+    with patch('requests.Session.get', return_value=mock_response):
         response = client.get('/rates?base=USD')
         assert response.status_code == 200
         data = json.loads(response.data)
@@ -0,0 +1,124 @@
+"""Tests du moteur de taux croisés à pivot unique"""
+import json
+import pytest
+from unittest.mock import patch, Mock
+
+from cross_rates import CrossRates
+
+
+def test_pivot_row_matches_upstream_table():
+    cross = CrossRates('USD', {'USD': 1, 'EUR': 0.85, 'MAD': 10.0})
+    assert cross.rates_for('USD') == {'EUR': 0.85, 'MAD': 10.0, 'USD': 1.0}
+
+
+def test_derived_base_row():
+    cross = CrossRates('USD', {'USD': 1, 'EUR': 0.5, 'GBP': 0.25})
+    rates = cross.rates_for('EUR')
+    assert rates['EUR'] == 1.0
+    assert rates['USD'] == pytest.approx(2.0)
+    assert rates['GBP'] == pytest.approx(0.5)
+    assert cross.rate('GBP', 'EUR') == pytest.approx(2.0)
+
+
+def test_pivot_is_added_when_missing():
+    cross = CrossRates('USD', {'EUR': 0.85})
+    assert 'USD' in cross
+    assert cross.rate('USD', 'EUR') == pytest.approx(0.85)
+
+
+def test_invalid_rates_are_dropped():
+    cross = CrossRates('USD', {'USD': 1, 'EUR': 0, 'GBP': -1.0})
+    assert 'EUR' not in cross
+    assert 'GBP' not in cross
+
+
+def test_derived_rows_are_memoized_and_bounded():
+    cross = CrossRates('USD', {'USD': 1, 'EUR': 0.5, 'GBP': 0.25}, max_rows=2)
+    row = cross.row('EUR')
+    assert cross.row('EUR') is row
+    assert not row.flags.writeable
+
+    cross.row('GBP')
+    cross.row('USD')
+    assert cross.row('EUR') is not row
+
+
+def test_empty_payload():
+    cross = CrossRates.from_payload({'result': 'error'}, 'USD')
+    assert len(cross) == 0
+    assert 'USD' not in cross
+
+
+def test_rates_for_any_base_uses_one_upstream_fetch(client):
+    mock_response = Mock()
+    mock_response.json.return_value = {
+        'result': 'success',
+        'base_code': 'USD',
+        'conversion_rates': {'USD': 1, 'EUR': 0.5, 'GBP': 0.25, 'JPY': 150.0}
+    }
+    with patch('requests.Session.get', return_value=mock_response) as upstream:
+        responses = [client.get(f'/rates?base={base}') for base in ('USD', 'EUR', 'GBP', 'JPY')]
+
+    assert upstream.call_count == 1
+    assert upstream.call_args.args[0].endswith('/latest/USD')
+    eur = responses[1].get_json()
+    assert eur['base'] == 'EUR'
+    assert eur['conversion_rates']['JPY'] == pytest.approx(300.0)
+
+
+def test_rates_unknown_base(client):
+    mock_response = Mock()
+    mock_response.json.return_value = {'result': 'success', 'conversion_rates': {'USD': 1, 'EUR': 0.5}}
+    with patch('requests.Session.get', return_value=mock_response):
+        response = client.get('/rates?base=ZZZ')
+
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
+
+
+def test_rates_empty_upstream_table(client):
+    mock_response = Mock()
+    mock_response.json.return_value = {'result': 'error', 'error-type': 'invalid-key'}
+    with patch('requests.Session.get', return_value=mock_response):
+        response = client.get('/rates')
+
+    assert response.status_code == 502
+
+
+def test_matrix_is_outer_division():
+    cross = CrossRates('USD', {'EUR': 0.5, 'GBP': 0.25})
+    grid = cross.matrix()
+
+    assert grid.shape == (3, 3)
+    for i, a in enumerate(cross.codes):
+        for j, b in enumerate(cross.codes):
+            assert grid[i, j] == pytest.approx(cross.rate(a, b))
+
+
+def test_matrix_chunks_are_memoized_for_full_table():
+    cross = CrossRates('USD', {'EUR': 0.5, 'GBP': 0.25})
+
+    assert cross.matrix_chunks() is cross.matrix_chunks()
+    subset = json.loads(b''.join(cross.matrix_chunks(['GBP', 'EUR'])))
+    assert subset['codes'] == ['GBP', 'EUR']
+    assert subset['rows'] == [[1.0, 2.0], [0.5, 1.0]]
+
+
+def test_bytes_roundtrip_is_zero_copy():
+    cross = CrossRates('USD', {'USD': 1, 'EUR': 0.5, 'JPY': 150.0}, fetched_at=1234.5)
+    data = cross.to_bytes()
+    restored = CrossRates.from_bytes(data)
+
+    assert restored.codes == cross.codes
+    assert restored.fetched_at == 1234.5
+    assert restored.rate('EUR', 'JPY') == pytest.approx(300.0)
+    # The values are a view over the payload, not a copy
+    assert not restored.values.flags.owndata
+    assert not restored.values.flags.writeable
+
+
+def test_rate_table_has_no_instance_dict():
+    cross = CrossRates('USD', {'USD': 1, 'EUR': 0.5})
+    assert not hasattr(cross, '__dict__')
+    with pytest.raises(AttributeError):
+        cross.extra = 1
@@ -0,0 +1,29 @@
+"""Tests du registre ISO 4217 intégré"""
+from currencies import CODES, CODES_BY_INDEX, INDEX, MINOR_UNITS, REGISTRY, is_known, name, unknown_codes
+from cross_rates import CrossRates
+
+
+def test_registry_is_sorted_and_indexed():
+    assert list(CODES_BY_INDEX) == sorted(CODES)
+    assert all(CODES_BY_INDEX[INDEX[code]] == code for code in CODES)
+    assert MINOR_UNITS[INDEX['JPY']] == 0
+    assert REGISTRY['KWD'].minor_units == 3
+    assert name('EUR') == 'Euro'
+
+
+def test_validation_without_io():
+    assert is_known('USD')
+    assert not is_known('ZZZ')
+    assert not is_known('usd')
+    assert not is_known(None)
+    assert unknown_codes(['USD', 'ABC', 'EUR', 'ZZZ']) == {'ABC', 'ZZZ'}
+
+
+def test_rate_table_offsets_are_registry_indexes():
+    cross = CrossRates('USD', {'USD': 1, 'EUR': 0.5, 'JPY': 150.0, 'NOT': 2.0})
+
+    assert cross.codes == ('EUR', 'JPY', 'USD')
+    assert len(cross.values) == len(CODES)
+    assert cross.positions(['JPY', 'GBP']).tolist() == [INDEX['JPY'], -1]
+    assert cross.values[INDEX['EUR']] == 0.5
+    assert cross.pivot_values().tolist() == [0.5, 150.0, 1.0]
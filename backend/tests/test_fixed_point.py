@@ -0,0 +1,158 @@
+"""Tests du mode de conversion exact en virgule fixe"""
+import random
+from decimal import Decimal, ROUND_HALF_EVEN, localcontext
+
+import numpy as np
+import pytest
+
+from cross_rates import CrossRates
+from fixed_point import (exact_rates, format_minor, minor_units, mul_div_pow10,
+                         mul_div_round, to_minor, RATE_DIGITS)
+
+RATE_SCALE = 10 ** 9
+
+
+def test_mul_div_round_matches_decimal():
+    rng = random.Random(42)
+    a = [rng.randint(-10 ** 15, 10 ** 15) for _ in range(2000)] + [5, 15, 25, -25]
+    b = [rng.randint(0, 10 ** 12) for _ in range(2000)] + [RATE_SCALE // 2] * 4
+
+    result, ok = mul_div_round(np.array(a), np.array(b), RATE_SCALE)
+
+    assert ok.all()
+    expected = [
+        int((Decimal(x) * y / RATE_SCALE).to_integral_value(ROUND_HALF_EVEN))
+        for x, y in zip(a, b)
+    ]
+    assert result.tolist() == expected
+    # Half-even on exact halves: 2.5 -> 2, 7.5 -> 8, 12.5 -> 12
+    assert result[-4:].tolist() == [2, 8, 12, -12]
+
+
+def test_mul_div_round_flags_overflow():
+    _, ok = mul_div_round(np.array([10 ** 15]), np.array([10 ** 13]), RATE_SCALE)
+    assert not ok[0]
+
+
+def test_to_minor_rejects_extra_decimals():
+    minor, exact, in_range = to_minor([10.01, 0.1, 10.005, 7.0, 1e16, float('inf')], np.array([2, 2, 2, 0, 2, 2]))
+
+    assert minor[exact].tolist() == [1001, 10, 7]
+    assert exact.tolist() == [True, True, False, True, False, False]
+    assert in_range.tolist() == [True, True, True, True, False, False]
+
+
+def test_mul_div_pow10_matches_decimal():
+    rng = random.Random(7)
+    a = [rng.randint(-10 ** 15, 10 ** 15) for _ in range(2000)] + [25, 35, 250000000001, 5]
+    b = [rng.randint(10 ** 14, 10 ** 15 - 1) for _ in range(2000)] + [1, 1, 1, 1]
+    scales = [rng.randint(0, 30) for _ in range(2000)] + [1, 1, 11, 0]
+
+    result, ok = mul_div_pow10(np.array(a), np.array(b), np.array(scales))
+
+    expected = [
+        int((Decimal(x) * y / Decimal(10) ** k).to_integral_value(ROUND_HALF_EVEN))
+        for x, y, k in zip(a, b, scales)
+    ]
+    fits = [abs(value) < 2 ** 63 for value in expected]
+    assert ok.tolist() == fits
+    assert result[ok].tolist() == [value for value, fit in zip(expected, fits) if fit]
+    # Exact halves go to even; a remainder dropped in an earlier step rounds up
+    assert result[-4:].tolist() == [2, 4, 3, 5]
+
+
+def test_exact_rates_keep_significant_digits():
+    values = np.array([1.0, 137000.0, 0.3075, 89500.0])
+    mantissas, scales = exact_rates(values, np.array([1, 0, 3, 0]), np.array([2, 1, 2, 0]))
+
+    assert all(10 ** (RATE_DIGITS - 1) <= m < 10 ** RATE_DIGITS for m in mantissas.tolist())
+    assert mantissas[0] / 10.0 ** scales[0] == pytest.approx(0.3075 / 137000, rel=1e-14)
+    assert mantissas[3] / 10.0 ** scales[3] == 1.0
+
+
+def test_minor_units_and_formatting():
+    assert (minor_units('JPY'), minor_units('KWD'), minor_units('EUR')) == (0, 3, 2)
+    assert format_minor(-5, 2) == '-0.05'
+    assert format_minor(123456, 3) == '123.456'
+    assert format_minor(7, 0) == '7'
+
+
+@pytest.fixture
+def cached_rates(cache_rates):
+    return cache_rates({'USD': 1, 'EUR': 0.921, 'JPY': 149.5, 'KWD': 0.3075})
+
+
+def test_convert_exact_rounds_to_target_minor_units(client, cached_rates):
+    data = client.get('/convert?from=USD&to=JPY,KWD,EUR&amount=10.01&exact=true').get_json()
+
+    assert data['exact'] is True
+    assert data['amount'] == '10.01'
+    assert data['converted'] == {'JPY': '1496', 'KWD': '3.078', 'EUR': '9.22'}
+    assert data['rates']['EUR'] == '0.921000000000000'
+
+
+def test_convert_exact_rejects_sub_minor_amount(client, cached_rates):
+    response = client.get('/convert?from=JPY&to=USD&amount=1.5&exact=1')
+
+    assert response.status_code == 400
+    assert 'at most 0 decimals' in response.get_json()['message']
+
+
+def test_batch_exact(client, cached_rates):
+    items = [
+        {'from': 'EUR', 'to': 'USD', 'amount': 100},
+        {'from': 'USD', 'to': 'EUR', 'amount': 0.001},
+    ]
+    data = client.post('/convert/batch?exact=true', json=items).get_json()
+
+    assert data['results'][0]['converted'] == '108.58'
+    assert data['results'][0]['amount'] == '100.00'
+    assert data['results'][1]['status'] == 'error'
+
+
+def _decimal_convert(cross, from_curr, to_curr, amount):
+    with localcontext() as context:
+        context.prec = 50
+        rate = Decimal(float(cross.values[cross.index[to_curr]])) / Decimal(float(cross.values[cross.index[from_curr]]))
+        quantum = Decimal(1).scaleb(-minor_units(to_curr))
+        return (Decimal(amount) * rate).quantize(quantum, rounding=ROUND_HALF_EVEN)
+
+
+@pytest.mark.parametrize('from_curr, to_curr, amount', [
+    ('IRR', 'KWD', 10_000_000_000),
+    ('LBP', 'KWD', 5_000_000_000_000),
+    ('IRR', 'BHD', 123_456_789_012),
+    ('KWD', 'IRR', 1_000_000),
+    ('VND', 'JPY', 987_654_321_987),
+])
+def test_low_to_high_value_pairs_match_decimal(from_curr, to_curr, amount):
+    cross = CrossRates('USD', {'USD': 1, 'IRR': 42105.263, 'KWD': 0.30742, 'LBP': 89554.78,
+                               'BHD': 0.376, 'JPY': 149.87, 'VND': 25410.5})
+    rates, scales, converted, exact, in_range = cross.convert_exact(
+        cross.positions([from_curr]), cross.positions([to_curr]), np.array([float(amount)])
+    )
+
+    assert exact[0] and in_range[0]
+    expected = _decimal_convert(cross, from_curr, to_curr, amount)
+    assert format_minor(converted[0], minor_units(to_curr)) == str(expected)
+    rate = Decimal(int(rates[0])).scaleb(-int(scales[0]))
+    assert len(str(rates[0])) == RATE_DIGITS
+    assert float(rate) == pytest.approx(cross.rate(from_curr, to_curr), rel=1e-14)
+
+
+def test_convert_exact_rejects_too_large_amount(client, cached_rates):
+    response = client.get('/convert?from=USD&to=EUR&amount=1e14&exact=true')
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Amount too large.'
+
+
+def test_batch_exact_separates_too_large_from_too_precise(client, cached_rates):
+    items = [
+        {'from': 'USD', 'to': 'EUR', 'amount': 1e14},
+        {'from': 'USD', 'to': 'EUR', 'amount': 1.001},
+    ]
+    results = client.post('/convert/batch?exact=true', json=items).get_json()['results']
+
+    assert results[0]['message'] == 'Amount too large.'
+    assert 'at most 2 decimals' in results[1]['message']
@@ -0,0 +1,120 @@
+"""Tests sous gevent : monkey patching et worker gunicorn -k gevent (cf. Dockerfile)"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip('gevent')
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(TESTS_DIR)
+
+
+def _env(**extra):
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR, EXCHANGE_API_KEY='test-key')
+    env.pop('RATES_SHARED_PATH', None)
+    env.update(extra)
+    return env
+
+
+def test_app_under_monkey_patch_all():
+    result = subprocess.run(
+        [sys.executable, os.path.join(TESTS_DIR, 'gevent_smoke.py')],
+        cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert 'ok 200 waiters 20 streams' in result.stdout
+
+
+class _Upstream(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps({
+            'result': 'success',
+            'base_code': 'USD',
+            'time_next_update_unix': time.time() + 3600,
+            'conversion_rates': {'USD': 1, 'EUR': 0.5},
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Upstream)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def gunicorn_gevent(upstream_server):
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--worker-class', 'gevent', '--workers', '1',
+         '--worker-connections', '1000', '--graceful-timeout', '1', '--bind', f'127.0.0.1:{port}', 'app:app'],
+        cwd=BACKEND_DIR, env=_env(EXCHANGE_API_URL=upstream_server),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            urllib.request.urlopen(f'{url}/health', timeout=1).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline or process.poll() is not None:
+                process.kill()
+                pytest.fail('gunicorn did not start')
+            time.sleep(0.1)
+    yield url
+    process.terminate()
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def test_parked_long_polls_do_not_hold_the_gevent_worker(gunicorn_gevent):
+    with urllib.request.urlopen(f'{gunicorn_gevent}/rates') as response:
+        version = response.headers['X-Rates-Version']
+
+    def wait():
+        with urllib.request.urlopen(f'{gunicorn_gevent}/rates/wait?version={version}&timeout=2', timeout=10) as r:
+            return r.status
+
+    # Far more parked requests than a sync worker could hold, on a single worker
+    with ThreadPoolExecutor(max_workers=100) as pool:
+        parked = [pool.submit(wait) for _ in range(100)]
+        time.sleep(0.5)
+        started = time.monotonic()
+        urllib.request.urlopen(f'{gunicorn_gevent}/health', timeout=5).close()
+        assert time.monotonic() - started < 1
+        assert [future.result() for future in parked] == [204] * 100
+
+    # The asyncio broadcaster also runs inside the patched worker
+    with urllib.request.urlopen(f'{gunicorn_gevent}/rates/stream', timeout=10) as stream:
+        frame = b''
+        while b'\n\n' not in frame:
+            frame += stream.read1(4096)
+    assert frame.startswith(f'id: {version}\nevent: rates\n'.encode())
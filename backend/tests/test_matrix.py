@@ -0,0 +1,33 @@
+"""Tests de l'endpoint /matrix"""
+import json
+import pytest
+
+
+@pytest.fixture
+def cached_rates(cache_rates):
+    return cache_rates({'USD': 1, 'EUR': 0.5, 'GBP': 0.25})
+
+
+def test_matrix_streams_full_grid(client, cached_rates):
+    response = client.get('/matrix')
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    data = json.loads(response.get_data())
+    assert data['codes'] == ['EUR', 'GBP', 'USD']
+    assert data['rows'][0] == pytest.approx([1.0, 0.5, 2.0])
+    assert 'X-Rates-Age' in response.headers
+
+
+def test_matrix_symbols_subset(client, cached_rates):
+    data = client.get('/matrix?symbols=USD,EUR').get_json()
+
+    assert data['codes'] == ['USD', 'EUR']
+    assert data['rows'] == [[1.0, 0.5], [2.0, 1.0]]
+
+
+def test_matrix_rejects_unknown_symbols(client, cached_rates):
+    response = client.get('/matrix?symbols=USD,XXX')
+
+    assert response.status_code == 400
+    assert 'XXX' in response.get_json()['message']
@@ -0,0 +1,89 @@
+"""Tests du cache des tables de taux"""
+import pytest
+from unittest.mock import patch, Mock
+
+from rate_cache import RateCache, expires_at_for
+
+
+def test_cache_hit_and_miss_counters(fake_clock):
+    cache = RateCache(max_entries=4, default_ttl=60, clock=fake_clock)
+    assert cache.get('USD') is None
+    cache.set('USD', {'EUR': 0.9})
+    assert cache.get('USD') == {'EUR': 0.9}
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_ratio'] == 0.5
+
+
+def test_cache_entry_expires(fake_clock):
+    clock = fake_clock
+    cache = RateCache(max_entries=4, default_ttl=60, clock=clock)
+    cache.set('USD', {'EUR': 0.9})
+
+    clock.now += 61
+    assert cache.get('USD') is None
+    assert cache.stats()['expirations'] == 1
+    assert len(cache) == 0
+
+
+def test_cache_evicts_least_recently_used(fake_clock):
+    cache = RateCache(max_entries=2, default_ttl=60, clock=fake_clock)
+    cache.set('USD', 1)
+    cache.set('EUR', 2)
+    cache.get('USD')
+    cache.set('GBP', 3)
+
+    assert cache.get('EUR') is None
+    assert cache.get('USD') == 1
+    assert cache.get('GBP') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_cache_rejects_empty_size():
+    with pytest.raises(ValueError):
+        RateCache(max_entries=0)
+
+
+def test_expiry_follows_upstream_next_update():
+    payload = {'time_next_update_unix': 5000}
+    assert expires_at_for(payload, default_ttl=60, now=1000) == 5000
+    # Missing or past update times fall back to the configured TTL
+    assert expires_at_for({}, default_ttl=60, now=1000) == 1060
+    assert expires_at_for({'time_next_update_unix': 10}, default_ttl=3600, now=1000) == 1060
+
+
+def test_rates_served_from_cache(client, latest_response):
+    """Deux appels /rates ne déclenchent qu'un seul appel amont"""
+    with patch('requests.Session.get', return_value=latest_response({'USD': 1, 'EUR': 0.85})) as upstream:
+        first = client.get('/rates?base=USD')
+        second = client.get('/rates?base=USD')
+
+    assert first.status_code == 200
+    assert second.get_json() == first.get_json()
+    assert upstream.call_count == 1
+
+
+def test_rates_cache_shared_across_bases(client, latest_response):
+    """Toutes les bases sont dérivées de la même table pivot en cache"""
+    with patch('requests.Session.get', return_value=latest_response({'USD': 1, 'EUR': 0.85})) as upstream:
+        client.get('/rates?base=USD')
+        client.get('/rates?base=EUR')
+
+    assert upstream.call_count == 1
+
+
+def test_rates_errors_are_not_cached(client):
+    error = Mock()
+    error.json.return_value = {'result': 'error', 'error-type': 'invalid-key'}
+    with patch('requests.Session.get', return_value=error) as upstream:
+        client.get('/rates?base=USD')
+        client.get('/rates?base=USD')
+
+    assert upstream.call_count == 2
+
+
+def test_health_reports_cache_stats(client):
+    response = client.get('/health')
+    assert 'hits' in response.get_json()['cache']
@@ -0,0 +1,83 @@
+"""Tests des instantanés de taux immuables et versionnés"""
+import threading
+import time
+
+from rate_snapshot import SnapshotRef
+
+
+def test_versions_are_monotonic_and_carry_fetch_time(rate_table):
+    ref = SnapshotRef()
+    assert ref.current() is None
+
+    first = ref.publish(rate_table(0.5, 1000), expires_at=2000)
+    second = ref.publish(rate_table(0.6, 1500), expires_at=2500)
+
+    # Version = fetch time in milliseconds, identical in every worker
+    assert (first.version, second.version) == (1_000_000, 1_500_000)
+    assert ref.current() is second
+    assert second.fetched_at == 1500
+    assert ref.stats()['publishes'] == 2
+
+
+def test_older_table_is_not_published(rate_table):
+    ref = SnapshotRef()
+    newer = ref.publish(rate_table(0.6, 2000), expires_at=3000)
+
+    assert ref.publish(rate_table(0.5, 1000), expires_at=2000) is newer
+    assert ref.current().table.rate('USD', 'EUR') == 0.6
+
+
+def test_readers_never_see_a_mixed_snapshot(rate_table):
+    ref = SnapshotRef()
+    ref.publish(rate_table(1.0, 0), expires_at=1)
+    stop = threading.Event()
+    mismatches = []
+
+    def writer():
+        i = 1
+        while not stop.is_set():
+            ref.publish(rate_table(float(i), i), expires_at=i + 1)
+            i += 1
+
+    def reader():
+        for _ in range(20000):
+            snapshot = ref.current()
+            # The rate and the metadata always come from the same publish
+            if snapshot.table.rate('USD', 'EUR') != float(snapshot.fetched_at or 1):
+                mismatches.append(snapshot)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads[1:]:
+        thread.join()
+    stop.set()
+    threads[0].join()
+
+    assert mismatches == []
+
+
+def test_request_keeps_one_snapshot(app, rate_table):
+    from app import cache_cross_rates, get_cross_rates
+    cache_cross_rates(rate_table(0.5, time.time()), time.time() + 60)
+
+    with app.app_context():
+        first = get_cross_rates()
+        cache_cross_rates(rate_table(0.8, time.time() + 1), time.time() + 60)
+        assert get_cross_rates() is first
+
+    with app.app_context():
+        assert get_cross_rates().rate('USD', 'EUR') == 0.8
+
+
+def test_history_is_bounded_and_republish_does_not_duplicate(rate_table):
+    ref = SnapshotRef(history=2)
+    first = ref.publish(rate_table(0.5, 1), expires_at=10)
+    ref.publish(rate_table(0.6, 2), expires_at=10)
+    again = ref.publish(ref.current().table, expires_at=20)
+    assert ref.find(again.version) is again
+    assert ref.find(first.version) is not None
+
+    ref.publish(rate_table(0.7, 3), expires_at=10)
+    assert ref.find(first.version) is None
+    assert ref.stats()['history'] == 2
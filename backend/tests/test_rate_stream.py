@@ -0,0 +1,77 @@
+"""Tests du flux Server-Sent Events des mises à jour de taux"""
+import time
+
+from rate_stream import RateBroadcaster, KEEPALIVE
+
+
+def test_each_update_is_encoded_once_for_all_subscribers(rate_table):
+    broadcaster = RateBroadcaster(keepalive=5)
+    broadcaster.publish(rate_table(0.5, 1))
+    streams = [broadcaster.stream() for _ in range(50)]
+    first = {next(stream) for stream in streams}
+    assert len(first) == 1 and b'id: 1000\nevent: rates\n' in first.pop()
+
+    assert broadcaster.publish(rate_table(0.6, 2))
+    frames = [next(stream) for stream in streams]
+    # Same bytes object handed to every subscriber
+    assert all(frame is frames[0] for frame in frames)
+    assert b'"EUR":0.6' in frames[0]
+    assert broadcaster.stats()['subscribers'] == 50
+
+    for stream in streams:
+        stream.close()
+
+
+def test_older_or_same_table_is_not_broadcast(rate_table):
+    broadcaster = RateBroadcaster()
+    assert broadcaster.publish(rate_table(0.5, 2))
+    assert not broadcaster.publish(rate_table(0.5, 2))
+    assert not broadcaster.publish(rate_table(0.4, 1))
+
+
+def test_idle_stream_sends_keepalives_and_skips_known_version(rate_table):
+    broadcaster = RateBroadcaster(keepalive=0.05)
+    broadcaster.publish(rate_table(0.5, 1))
+    stream = broadcaster.stream(last_version=1000)
+    assert next(stream) == KEEPALIVE
+    stream.close()
+
+
+def test_poll_runs_while_someone_listens(rate_table):
+    polled = []
+    broadcaster = RateBroadcaster(poll=lambda: polled.append(1) or broadcaster.publish(rate_table(0.7, 3)),
+                                  poll_interval=0.01, keepalive=5)
+    stream = broadcaster.stream()
+    assert b'"EUR":0.7' in next(stream)
+    assert polled
+    stream.close()
+
+
+def test_rates_stream_endpoint(client, rate_table):
+    from app import cache_cross_rates, rate_broadcaster
+    cache_cross_rates(rate_table(0.5, time.time() - 10), time.time() + 600)
+
+    response = client.get('/rates/stream', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    assert response.cache_control.no_cache
+    frames = iter(response.response)
+    assert b'"EUR":0.5' in next(frames)
+
+    # A new snapshot is pushed to the open stream
+    cache_cross_rates(rate_table(0.55, time.time()), time.time() + 600)
+    assert b'"EUR":0.55' in next(frames)
+    assert rate_broadcaster.stats()['broadcasts'] >= 1
+    response.close()
+
+
+def test_rates_stream_resumes_from_last_event_id(client, monkeypatch, rate_table):
+    from app import cache_cross_rates, rate_broadcaster
+    cross = rate_table(0.5, time.time())
+    cache_cross_rates(cross, time.time() + 600)
+    monkeypatch.setattr(rate_broadcaster, 'keepalive', 0.05)
+
+    response = client.get('/rates/stream', buffered=False,
+                          headers={'Last-Event-ID': str(round(cross.fetched_at * 1000))})
+    # Already up to date: nothing but keepalives until the next snapshot
+    assert next(iter(response.response)) == KEEPALIVE
+    response.close()
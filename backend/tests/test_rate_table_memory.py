@@ -0,0 +1,38 @@
+"""Benchmark mémoire: table de taux compacte vs un dict conversion_rates par base"""
+import gc
+import tracemalloc
+
+import currencies
+from cross_rates import CrossRates
+
+
+def _allocated(build):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        kept = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert kept is not None
+    return size
+
+
+def _pivot_rates():
+    return {code: 1.0 + i / 7 for i, code in enumerate(currencies.CODES_BY_INDEX)}
+
+
+def test_rate_table_is_far_smaller_than_dict_per_base():
+    pivot = _pivot_rates()
+    cross = CrossRates('USD', pivot)
+
+    # Former layout: one conversion_rates dict per base currency
+    dict_per_base = _allocated(lambda: {base: cross.rates_for(base) for base in cross.codes})
+    # Same information as one registry-indexed float64 table
+    table = _allocated(lambda: CrossRates('USD', pivot))
+    # Even with every base row memoized, rows are plain float64 arrays
+    rows = _allocated(lambda: [cross.row(base) for base in cross.codes])
+
+    print(f"\ndict per base: {dict_per_base} B, table: {table} B, all rows: {rows} B")
+    assert table * 20 < dict_per_base
+    assert rows * 2 < dict_per_base
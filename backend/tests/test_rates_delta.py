@@ -0,0 +1,85 @@
+"""Tests de /rates/delta : seulement les taux modifiés depuis une version"""
+import time
+import numpy as np
+import pytest
+
+from cross_rates import CrossRates
+
+
+def _publish(rates, fetched_at):
+    from app import cache_cross_rates
+    cross = CrossRates('USD', rates, fetched_at=fetched_at)
+    cache_cross_rates(cross, time.time() + 600)
+    return cross
+
+
+@pytest.fixture
+def two_snapshots():
+    now = time.time()
+    old = _publish({'USD': 1, 'EUR': 0.5, 'GBP': 0.8, 'JPY': 150}, now - 10)
+    new = _publish({'USD': 1, 'EUR': 0.55, 'GBP': 0.8, 'CHF': 0.9}, now)
+    return old, new
+
+
+def _version(response):
+    return int(response.headers['X-Rates-Version'])
+
+
+def test_changes_since_is_a_vectorized_diff():
+    old = CrossRates('USD', {'USD': 1, 'EUR': 0.5, 'GBP': 0.8, 'JPY': 150})
+    new = CrossRates('USD', {'USD': 1, 'EUR': 0.55, 'GBP': 0.8, 'CHF': 0.9})
+
+    codes, rates, removed = new.changes_since(old, 'USD')
+    assert codes == ('CHF', 'EUR')
+    np.testing.assert_allclose(rates, [0.9, 0.55])
+    assert removed == ('JPY',)
+    # Against EUR every rate moves since the base itself changed
+    assert set(new.changes_since(old, 'EUR')[0]) == {'CHF', 'GBP', 'USD'}
+
+
+def test_delta_returns_only_changed_rates(client, two_snapshots):
+    old, new = two_snapshots
+    since = round(old.fetched_at * 1000)
+
+    response = client.get(f'/rates/delta?since={since}')
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert body['full'] is False
+    assert body['since'] == since
+    assert body['version'] == _version(response) == round(new.fetched_at * 1000)
+    assert body['conversion_rates'] == pytest.approx({'CHF': 0.9, 'EUR': 0.55})
+    assert body['removed'] == ['JPY']
+
+
+def test_delta_is_204_when_up_to_date(client, two_snapshots):
+    version = _version(client.get('/rates'))
+
+    response = client.get(f'/rates/delta?since={version}')
+    assert response.status_code == 204
+    assert response.data == b''
+
+
+def test_delta_is_204_when_values_did_not_change(client):
+    now = time.time()
+    old = _publish({'USD': 1, 'EUR': 0.5}, now - 10)
+    _publish({'USD': 1, 'EUR': 0.5}, now)
+
+    response = client.get(f'/rates/delta?since={round(old.fetched_at * 1000)}')
+    assert response.status_code == 204
+
+
+def test_delta_falls_back_to_full_table_for_evicted_version(client, two_snapshots):
+    response = client.get('/rates/delta?since=12345&base=EUR')
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert body['full'] is True
+    assert body['base'] == 'EUR'
+    assert body['conversion_rates']['USD'] == pytest.approx(1 / 0.55)
+
+
+def test_delta_rejects_bad_parameters(client, two_snapshots):
+    assert client.get('/rates/delta').status_code == 400
+    assert client.get('/rates/delta?since=abc').status_code == 400
+    assert client.get('/rates/delta?since=1&base=XYZ').status_code == 400
@@ -0,0 +1,82 @@
+"""Tests des requêtes conditionnelles sur /rates (ETag / If-None-Match)"""
+import time
+import pytest
+from unittest.mock import patch
+
+from cross_rates import CrossRates
+
+
+@pytest.fixture
+def cached_rates(cache_rates):
+    return cache_rates({'USD': 1, 'EUR': 0.5}, ttl=600)
+
+
+def test_rates_sets_strong_etag_and_max_age(client, cached_rates):
+    response = client.get('/rates?base=EUR')
+
+    etag, weak = response.get_etag()
+    assert etag and not weak
+    assert response.cache_control.public
+    assert 590 <= response.cache_control.max_age <= 600
+
+
+def test_if_none_match_returns_empty_304(client, cached_rates):
+    etag = client.get('/rates').get_etag()[0]
+
+    with patch('requests.Session.get') as upstream:
+        response = client.get('/rates', headers={'If-None-Match': f'"{etag}"'})
+        # Proxies that gzip may weaken the validator, it must still match
+        weakened = client.get('/rates', headers={'If-None-Match': f'W/"{etag}"'})
+
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.get_etag()[0] == etag
+    assert weakened.status_code == 304
+    upstream.assert_not_called()
+
+
+def test_etag_changes_with_table_and_base(client, cached_rates):
+    from app import cache_cross_rates
+    usd = client.get('/rates').get_etag()[0]
+    eur = client.get('/rates?base=EUR').get_etag()[0]
+    assert usd != eur
+
+    cache_cross_rates(CrossRates('USD', {'USD': 1, 'EUR': 0.6}, fetched_at=time.time() + 1), time.time() + 600)
+    response = client.get('/rates', headers={'If-None-Match': f'"{usd}"'})
+
+    assert response.status_code == 200
+    assert response.get_json()['conversion_rates']['EUR'] == 0.6
+
+
+def test_rates_served_pre_compressed(client, cached_rates):
+    import gzip
+    import brotli
+    plain = client.get('/rates?base=EUR')
+    gzipped = client.get('/rates?base=EUR', headers={'Accept-Encoding': 'gzip'})
+    brotlied = client.get('/rates?base=EUR', headers={'Accept-Encoding': 'gzip, br'})
+
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert brotlied.headers['Content-Encoding'] == 'br'
+    assert 'Accept-Encoding' in plain.headers['Vary']
+    assert gzip.decompress(gzipped.get_data()) == plain.get_data()
+    assert brotli.decompress(brotlied.get_data()) == plain.get_data()
+    # Each coding is its own representation, with its own validator
+    assert len({r.get_etag()[0] for r in (plain, gzipped, brotlied)}) == 3
+
+
+def test_bodies_built_once_per_table(client, cached_rates):
+    client.get('/rates?base=EUR')
+    with patch('cross_rates.json') as json_module:
+        response = client.get('/rates?base=EUR', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.status_code == 200
+    json_module.dumps.assert_not_called()
+    assert cached_rates.rates_body('EUR', 'gzip') is cached_rates.rates_body('EUR', 'gzip')
+
+
+def test_pivot_body_prepared_at_publish(cached_rates):
+    with patch('cross_rates.json') as json_module, patch('cross_rates.gzip') as gzip_module:
+        cached_rates.rates_body('USD')
+        cached_rates.rates_body('USD', 'gzip')
+    json_module.dumps.assert_not_called()
+    gzip_module.compress.assert_not_called()
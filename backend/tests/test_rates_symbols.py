@@ -0,0 +1,68 @@
+"""Tests du filtrage par symboles sur /rates"""
+import gzip
+import pytest
+from unittest.mock import patch
+
+from cross_rates import CrossRates
+
+
+@pytest.fixture
+def cached_rates(cache_rates):
+    return cache_rates({'USD': 1, 'EUR': 0.5, 'GBP': 0.25, 'JPY': 150.0}, ttl=600)
+
+
+def test_rates_symbols_subset(client, cached_rates):
+    data = client.get('/rates?base=EUR&symbols=JPY,USD').get_json()
+
+    assert data['base'] == 'EUR'
+    assert data['conversion_rates'] == pytest.approx({'JPY': 300.0, 'USD': 2.0})
+
+
+def test_symbol_sets_memoized_under_canonical_key(client, cached_rates):
+    first = client.get('/rates?symbols=JPY,EUR')
+    with patch('cross_rates.json') as json_module:
+        second = client.get('/rates?symbols=EUR,JPY,EUR')
+
+    json_module.dumps.assert_not_called()
+    assert second.get_data() == first.get_data()
+    assert second.get_etag() == first.get_etag()
+    assert first.get_etag() != client.get('/rates').get_etag()
+
+
+def test_rates_symbols_validation(client, cached_rates):
+    with patch('requests.Session.get') as upstream:
+        invalid = client.get('/rates?symbols=EUR,ABC')
+    missing = client.get('/rates?symbols=EUR,CHF')
+
+    upstream.assert_not_called()
+    assert invalid.status_code == 400
+    assert 'ABC' in invalid.get_json()['message']
+    assert missing.status_code == 400
+    assert 'CHF' in missing.get_json()['message']
+
+
+def test_symbol_bodies_are_bounded(monkeypatch):
+    import cross_rates
+    monkeypatch.setattr(cross_rates, 'MAX_BODIES', 2)
+    cross = CrossRates('USD', {'USD': 1, 'EUR': 0.5, 'GBP': 0.25})
+    first = cross.rates_body('USD', symbols=('EUR',))
+    cross.rates_body('USD', symbols=('GBP',))
+    cross.rates_body('USD', symbols=('EUR', 'GBP'))
+
+    assert cross.rates_body('USD', symbols=('EUR',)) is not first
+
+
+def test_subset_bodies_compressed_only_on_demand():
+    cross = CrossRates('USD', {'USD': 1, 'EUR': 0.5, 'GBP': 0.25})
+    with patch('cross_rates.gzip') as gzip_module, patch('cross_rates.brotli') as brotli_module:
+        cross.rates_body('USD', symbols=('EUR',))
+    gzip_module.compress.assert_not_called()
+    brotli_module.compress.assert_not_called()
+
+    with patch('cross_rates.gzip', wraps=gzip) as gzip_module:
+        body = cross.rates_body('USD', 'gzip', ('EUR',))
+        assert cross.rates_body('USD', 'gzip', ('EUR',)) is body
+    # Cheaper level than the full table, compressed once
+    gzip_module.compress.assert_called_once()
+    assert gzip_module.compress.call_args.kwargs['compresslevel'] == 6
+    assert gzip.decompress(body) == cross.rates_body('USD', symbols=('EUR',))
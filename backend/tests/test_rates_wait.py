@@ -0,0 +1,64 @@
+"""Tests du long polling /rates/wait"""
+import threading
+import time
+import pytest
+
+from rate_snapshot import SnapshotRef
+
+
+def test_wait_newer_wakes_on_publish(rate_table):
+    ref = SnapshotRef()
+    ref.publish(rate_table(0.5, 1), expires_at=10)
+    timer = threading.Timer(0.05, ref.publish, args=(rate_table(0.6, 2), 10))
+    timer.start()
+
+    snapshot = ref.wait_newer(1000, timeout=5)
+    assert snapshot.version == 2000
+    # Already newer: returned without waiting
+    assert ref.wait_newer(1000, timeout=0) is snapshot
+    assert ref.wait_newer(2000, timeout=0.01) is None
+
+
+def test_rates_wait_returns_immediately_when_newer(client, rate_table):
+    from app import cache_cross_rates
+    cross = rate_table(0.5, time.time())
+    cache_cross_rates(cross, time.time() + 600)
+
+    response = client.get('/rates/wait?version=0&base=EUR')
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['version'] == round(cross.fetched_at * 1000)
+    assert body['conversion_rates']['USD'] == pytest.approx(2.0)
+
+
+def test_rates_wait_parks_until_next_snapshot(client, rate_table):
+    from app import cache_cross_rates
+    now = time.time()
+    current = rate_table(0.5, now - 10)
+    cache_cross_rates(current, now + 600)
+    version = round(current.fetched_at * 1000)
+    timer = threading.Timer(0.1, cache_cross_rates, args=(rate_table(0.6, now), now + 600))
+    timer.start()
+
+    started = time.monotonic()
+    response = client.get(f'/rates/wait?version={version}&timeout=5')
+    assert 0.05 < time.monotonic() - started < 5
+    assert response.status_code == 200
+    assert response.get_json()['conversion_rates']['EUR'] == pytest.approx(0.6)
+
+
+def test_rates_wait_times_out_with_204(client, rate_table):
+    from app import cache_cross_rates
+    cross = rate_table(0.5, time.time())
+    cache_cross_rates(cross, time.time() + 600)
+
+    response = client.get(f'/rates/wait?version={round(cross.fetched_at * 1000)}&timeout=0.05')
+    assert response.status_code == 204
+    assert response.headers['X-Rates-Version'] == str(round(cross.fetched_at * 1000))
+
+
+def test_rates_wait_rejects_bad_parameters(client):
+    assert client.get('/rates/wait?version=abc').status_code == 400
+    assert client.get('/rates/wait?timeout=-1').status_code == 400
+    assert client.get('/rates/wait?timeout=3600').status_code == 400
+    assert client.get('/rates/wait?base=XYZ').status_code == 400
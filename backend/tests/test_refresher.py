@@ -0,0 +1,90 @@
+"""Tests du rafraîchissement en arrière-plan (stale-while-revalidate)"""
+import threading
+import time
+import pytest
+from unittest.mock import patch
+
+from cross_rates import CrossRates
+from rate_cache import RateCache
+from refresher import RateRefresher
+
+
+def test_cache_serves_stale_entry_within_window():
+    now = [1000.0]
+    cache = RateCache(default_ttl=60, max_stale=30, clock=lambda: now[0])
+    cache.set('USD', 'table')
+
+    now[0] += 70
+    assert cache.lookup('USD') == ('table', True)
+    assert cache.get('USD') is None
+
+    now[0] += 30
+    assert cache.lookup('USD') == (None, False)
+    assert cache.stats()['expirations'] == 1
+
+
+def test_refresher_loads_in_background():
+    loaded = []
+    refresher = RateRefresher(loaded.append)
+    refresher.refresh('USD')
+    assert refresher.wait_idle(timeout=5)
+    assert loaded == ['USD']
+    assert refresher.stats()['refreshes'] == 1
+
+
+def test_refresher_deduplicates_pending_keys():
+    release = threading.Event()
+    loaded = []
+
+    def load(key):
+        release.wait(5)
+        loaded.append(key)
+
+    refresher = RateRefresher(load)
+    refresher.refresh('USD')
+    refresher.refresh('EUR')
+    refresher.refresh('EUR')
+    release.set()
+    assert refresher.wait_idle(timeout=5)
+    assert sorted(loaded) == ['EUR', 'USD']
+
+
+def test_refresher_records_failures():
+    def load(key):
+        raise ConnectionError('upstream down')
+
+    refresher = RateRefresher(load)
+    refresher.refresh('USD')
+    assert refresher.wait_idle(timeout=5)
+    assert refresher.stats()['failures'] == 1
+    assert 'upstream down' in refresher.stats()['last_error']
+
+
+def test_stale_table_served_while_refreshing(client, latest_response):
+    from app import rate_cache, rate_refresher, RATES_PIVOT
+    old = CrossRates('USD', {'USD': 1, 'EUR': 0.5}, fetched_at=time.time() - 120)
+    rate_cache.set(RATES_PIVOT, old, expires_at=time.time() - 60)
+
+    with patch('requests.Session.get', return_value=latest_response({'USD': 1, 'EUR': 0.8})) as upstream:
+        response = client.get('/rates')
+        assert response.get_json()['conversion_rates']['EUR'] == 0.5
+        assert int(response.headers['X-Rates-Age']) >= 120
+
+        assert rate_refresher.wait_idle(timeout=5)
+        refreshed = client.get('/rates')
+
+    assert upstream.call_count == 1
+    assert refreshed.get_json()['conversion_rates']['EUR'] == 0.8
+    assert int(refreshed.headers['X-Rates-Age']) < 5
+
+
+def test_too_stale_table_blocks_on_upstream(client, latest_response):
+    from app import rate_cache, RATES_PIVOT, RATES_MAX_STALENESS
+    old = CrossRates('USD', {'USD': 1, 'EUR': 0.5})
+    rate_cache.set(RATES_PIVOT, old, expires_at=time.time() - RATES_MAX_STALENESS - 1)
+
+    with patch('requests.Session.get', return_value=latest_response({'USD': 1, 'EUR': 0.8})):
+        response = client.get('/convert?from=USD&to=EUR&amount=10')
+
+    assert response.get_json()['converted'] == pytest.approx(8.0)
+    assert 'X-Rates-Age' in response.headers
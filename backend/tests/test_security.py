@@ -12,7 +12,7 @@ def test_api_key_not_exposed_in_response(client):
     }
     mock_response.raise_for_status = Mock()
 
-    with patch('requests.get', return_value=mock_response):
+    with patch('requests.Session.get', return_value=mock_response):
         response = client.get('/rates')
         data_str = str(response.get_data())
 
@@ -29,7 +29,7 @@ def test_cors_configured_properly(client):
     mock_response.json.return_value = {'result': 'success', 'conversion_rates': {}}
     mock_response.raise_for_status = Mock()
 
-    with patch('requests.get', return_value=mock_response):
+    with patch('requests.Session.get', return_value=mock_response):
         response = client.get('/rates', headers={'Origin': 'http://localhost:5173'})
         assert 'Access-Control-Allow-Origin' in response.headers
 
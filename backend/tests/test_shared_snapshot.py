@@ -0,0 +1,171 @@
+"""Tests de la table de taux partagée entre workers (fichier mmap)"""
+import multiprocessing
+import time
+import pytest
+from unittest.mock import patch, Mock
+
+from cross_rates import CrossRates
+from shared_snapshot import SharedRateSnapshot
+
+
+def _hold_lock(path, ready, release):
+    snapshot = SharedRateSnapshot(path)
+    with snapshot.refresh_lock() as acquired:
+        assert acquired
+        ready.set()
+        release.wait(5)
+
+
+def _publish_from_worker(path):
+    SharedRateSnapshot(path).publish(CrossRates('USD', {'USD': 1, 'EUR': 0.5}), time.time() + 60)
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / 'rates.snapshot')
+
+
+def test_publish_and_read_roundtrip(snapshot_path):
+    snapshot = SharedRateSnapshot(snapshot_path)
+    assert snapshot.read() is None
+
+    cross = CrossRates('USD', {'USD': 1, 'EUR': 0.5, 'JPY': 150.0}, fetched_at=1234.5)
+    assert snapshot.publish(cross, expires_at=time.time() + 60) == 1
+
+    entry = SharedRateSnapshot(snapshot_path).read()
+    assert entry.version == 1
+    assert entry.cross.pivot == 'USD'
+    assert entry.cross.fetched_at == 1234.5
+    assert entry.cross.rates_for('EUR') == cross.rates_for('EUR')
+
+
+def test_read_maps_values_without_copy(snapshot_path):
+    snapshot = SharedRateSnapshot(snapshot_path)
+    snapshot.publish(CrossRates('USD', {'USD': 1, 'EUR': 0.5}), expires_at=time.time() + 60)
+    values = snapshot.read().cross.values
+
+    assert not values.flags.owndata
+    assert not values.flags.writeable
+
+
+def test_version_increments_and_remaps_only_on_change(snapshot_path):
+    writer = SharedRateSnapshot(snapshot_path)
+    reader = SharedRateSnapshot(snapshot_path)
+    writer.publish(CrossRates('USD', {'USD': 1, 'EUR': 0.5}), expires_at=time.time() + 60)
+    first = reader.read()
+    assert reader.read() is first
+
+    writer.publish(CrossRates('USD', {'USD': 1, 'EUR': 0.6}), expires_at=time.time() + 60)
+    second = reader.read()
+    assert second.version == 2
+    assert second.cross.rate('USD', 'EUR') == pytest.approx(0.6)
+    # The previous mapping stays valid for readers still holding it
+    assert first.cross.rate('USD', 'EUR') == pytest.approx(0.5)
+    assert reader.stats()['remaps'] == 2
+
+
+def test_snapshot_published_by_another_process(snapshot_path):
+    process = multiprocessing.get_context('fork').Process(target=_publish_from_worker, args=(snapshot_path,))
+    process.start()
+    process.join(10)
+
+    entry = SharedRateSnapshot(snapshot_path).read()
+    assert entry.version == 1
+    assert 'EUR' in entry.cross
+
+
+def test_refresh_lock_is_exclusive_across_processes(snapshot_path):
+    context = multiprocessing.get_context('fork')
+    ready, release = context.Event(), context.Event()
+    holder = context.Process(target=_hold_lock, args=(snapshot_path, ready, release))
+    holder.start()
+    try:
+        assert ready.wait(5)
+        with SharedRateSnapshot(snapshot_path).refresh_lock(timeout=0.1) as acquired:
+            assert not acquired
+    finally:
+        release.set()
+        holder.join(10)
+
+    with SharedRateSnapshot(snapshot_path).refresh_lock(timeout=1) as acquired:
+        assert acquired
+
+
+def test_refresh_lock_without_flock(snapshot_path, monkeypatch):
+    # Windows has no fcntl: the module still imports and the lock is a no-op
+    monkeypatch.setattr('shared_snapshot.fcntl', None)
+    with SharedRateSnapshot(snapshot_path).refresh_lock(timeout=0.1) as acquired:
+        assert acquired
+
+
+def test_worker_uses_shared_snapshot_instead_of_upstream(client, monkeypatch, snapshot_path):
+    import app
+    SharedRateSnapshot(snapshot_path).publish(
+        CrossRates('USD', {'USD': 1, 'EUR': 0.25}), expires_at=time.time() + 60
+    )
+    monkeypatch.setattr(app, 'shared_rates', SharedRateSnapshot(snapshot_path))
+
+    with patch('requests.Session.get') as upstream:
+        response = client.get('/rates?base=USD')
+
+    assert response.get_json()['conversion_rates']['EUR'] == 0.25
+    assert upstream.call_count == 0
+
+
+def test_worker_refresh_publishes_snapshot(client, monkeypatch, snapshot_path):
+    import app
+    monkeypatch.setattr(app, 'shared_rates', SharedRateSnapshot(snapshot_path))
+    mock_response = Mock()
+    mock_response.json.return_value = {'result': 'success', 'conversion_rates': {'USD': 1, 'EUR': 0.5}}
+
+    with patch('requests.Session.get', return_value=mock_response) as upstream:
+        client.get('/rates')
+        # A second worker: empty local cache, same host-wide file
+        app.rate_cache.clear()
+        app.rate_snapshot.clear()
+        monkeypatch.setattr(app, 'shared_rates', SharedRateSnapshot(snapshot_path))
+        response = client.get('/rates?base=EUR')
+
+    assert upstream.call_count == 1
+    assert response.get_json()['conversion_rates']['USD'] == pytest.approx(2.0)
+
+
+@pytest.fixture
+def lock_held_elsewhere(snapshot_path):
+    context = multiprocessing.get_context('fork')
+    ready, release = context.Event(), context.Event()
+    holder = context.Process(target=_hold_lock, args=(snapshot_path, ready, release))
+    holder.start()
+    assert ready.wait(5)
+    yield
+    release.set()
+    holder.join(10)
+
+
+def test_lock_timeout_serves_stale_shared_table_without_upstream(client, monkeypatch, snapshot_path,
+                                                                 lock_held_elsewhere):
+    import app
+    SharedRateSnapshot(snapshot_path).publish(
+        CrossRates('USD', {'USD': 1, 'EUR': 0.25}), expires_at=time.time() - 1
+    )
+    monkeypatch.setattr(app, 'shared_rates', SharedRateSnapshot(snapshot_path))
+    monkeypatch.setattr(app, 'UPSTREAM_WAIT_TIMEOUT', 0.1)
+
+    with patch('requests.Session.get') as upstream:
+        response = client.get('/rates?base=USD')
+
+    assert response.get_json()['conversion_rates']['EUR'] == 0.25
+    assert upstream.call_count == 0
+
+
+def test_lock_timeout_without_shared_table_does_not_hit_upstream(client, monkeypatch, snapshot_path,
+                                                                 lock_held_elsewhere):
+    import app
+    monkeypatch.setattr(app, 'shared_rates', SharedRateSnapshot(snapshot_path))
+    monkeypatch.setattr(app, 'UPSTREAM_WAIT_TIMEOUT', 0.1)
+
+    with patch('requests.Session.get') as upstream:
+        response = client.get('/rates')
+
+    assert response.status_code == 500
+    assert upstream.call_count == 0
@@ -0,0 +1,121 @@
+"""Tests de la coalescence des appels amont (single-flight)"""
+import threading
+import pytest
+from unittest.mock import patch, Mock
+
+from single_flight import SingleFlight, SingleFlightTimeout
+
+
+def _run_concurrently(count, target):
+    results = [None] * count
+    errors = [None] * count
+
+    def worker(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def _wait_for_waiters(flight, count):
+    for _ in range(200):
+        if flight.coalesced >= count:
+            return
+        threading.Event().wait(0.01)
+
+
+def test_concurrent_calls_share_one_execution():
+    release = threading.Event()
+    served = []
+    flight = SingleFlight(wait_timeout=5, on_flight=lambda key, n: served.append((key, n)))
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return 'table'
+
+    threads, results, errors = _run_concurrently(8, lambda: flight.do('USD', fetch))
+    _wait_for_waiters(flight, 7)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ['table'] * 8
+    assert served == [('USD', 8)]
+    assert flight.stats()['max_served'] == 8
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_waiters_receive_leader_error():
+    release = threading.Event()
+    flight = SingleFlight(wait_timeout=5)
+
+    def fetch():
+        release.wait(5)
+        raise ConnectionError('upstream down')
+
+    threads, results, errors = _run_concurrently(3, lambda: flight.do('USD', fetch))
+    _wait_for_waiters(flight, 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert all(isinstance(e, ConnectionError) for e in errors)
+
+
+def test_waiter_gives_up_after_timeout():
+    release = threading.Event()
+    flight = SingleFlight(wait_timeout=0.05)
+    leader = threading.Thread(target=flight.do, args=('USD', lambda: release.wait(5)))
+    leader.start()
+    while flight.stats()['in_flight'] == 0:
+        threading.Event().wait(0.01)
+
+    try:
+        with pytest.raises(SingleFlightTimeout):
+            flight.do('USD', lambda: 'unused')
+    finally:
+        release.set()
+        leader.join()
+    assert flight.stats()['timeouts'] == 1
+
+
+def test_sequential_calls_run_again():
+    flight = SingleFlight()
+    assert flight.do('USD', lambda: 1) == 1
+    assert flight.do('USD', lambda: 2) == 2
+    assert flight.stats()['flights'] == 2
+
+
+def test_concurrent_rates_requests_fetch_once(app):
+    release = threading.Event()
+    mock_response = Mock()
+    mock_response.json.return_value = {
+        'result': 'success',
+        'conversion_rates': {'USD': 1, 'EUR': 0.5}
+    }
+
+    def slow_get(url, **kwargs):
+        release.wait(5)
+        return mock_response
+
+    from app import upstream_flight
+    already_coalesced = upstream_flight.coalesced
+    with patch('requests.Session.get', side_effect=slow_get) as upstream:
+        threads, results, errors = _run_concurrently(
+            6, lambda: app.test_client().get('/rates?base=EUR').status_code
+        )
+        _wait_for_waiters(upstream_flight, already_coalesced + 5)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+    assert results == [200] * 6
+    assert upstream.call_count == 1
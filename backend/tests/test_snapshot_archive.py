@@ -0,0 +1,138 @@
+"""Tests de l'archivage des tables de taux dans MongoDB (mongomock)"""
+import time
+import pytest
+import mongomock
+from unittest.mock import patch
+
+from cross_rates import CrossRates
+from snapshot_archive import RateArchive
+
+
+@pytest.fixture
+def archive():
+    archive = RateArchive(mongomock.MongoClient().db.rate_snapshots, batch_size=10, flush_interval=0.01)
+    archive.ensure_indexes()
+    return archive
+
+
+def test_compound_index_created(archive):
+    keys = [index['key'] for index in archive.collection.index_information().values()]
+    assert [('base', 1), ('fetched_at', -1)] in keys
+
+
+def test_snapshots_written_in_batches(archive):
+    with patch.object(archive.collection, 'bulk_write', wraps=archive.collection.bulk_write) as bulk_write:
+        for i in range(5):
+            archive.record(CrossRates('USD', {'USD': 1, 'EUR': 0.5 + i / 10}, fetched_at=1000 + i), time.time() + 60)
+        archive.flush()
+
+    assert archive.collection.count_documents({}) == 5
+    assert bulk_write.call_count < 5
+    assert archive.stats()['written'] == 5
+
+
+def test_latest_and_history(archive):
+    for i in range(3):
+        archive.record(CrossRates('USD', {'USD': 1, 'EUR': 0.5 + i / 10}, fetched_at=1000 + i), 5000)
+    archive.flush()
+
+    cross, expires_at = archive.latest('USD')
+    assert cross.fetched_at == 1002
+    assert cross.rate('USD', 'EUR') == pytest.approx(0.7)
+    assert expires_at == 5000
+
+    history = archive.history('USD', limit=2)
+    assert [snapshot.fetched_at for snapshot in history] == [1002, 1001]
+    assert archive.history('USD', since=1001.5)[0].fetched_at == 1002
+    assert archive.latest('EUR') is None
+
+
+def test_write_failures_are_counted(archive):
+    with patch.object(archive.collection, 'bulk_write', side_effect=RuntimeError('mongod down')):
+        archive.record(CrossRates('USD', {'USD': 1, 'EUR': 0.5}), time.time() + 60)
+        archive.flush()
+
+    assert archive.stats()['failures'] == 1
+
+
+def test_fetched_tables_are_archived_and_used_for_warm_start(client, monkeypatch, archive, latest_response):
+    import app
+    monkeypatch.setattr(app, 'rate_archive', archive)
+
+    with patch('requests.Session.get', return_value=latest_response({'USD': 1, 'EUR': 0.5}, time_next_update_unix=time.time() + 3600)) as upstream:
+        client.get('/rates')
+        archive.flush()
+        # Restart: empty cache, the archive still holds a fresh table
+        app.rate_cache.clear()
+        app.rate_snapshot.clear()
+        response = client.get('/rates?base=EUR')
+
+    assert upstream.call_count == 1
+    assert response.get_json()['conversion_rates']['USD'] == pytest.approx(2.0)
+
+
+def test_history_endpoint(client, monkeypatch, archive):
+    import app
+    monkeypatch.setattr(app, 'rate_archive', archive)
+    archive.record(CrossRates('USD', {'USD': 1, 'EUR': 0.5}, fetched_at=1000), 2000)
+    archive.record(CrossRates('USD', {'USD': 1, 'EUR': 0.25}, fetched_at=3000), 4000)
+    archive.flush()
+
+    with patch('requests.Session.get') as upstream:
+        response = client.get('/rates/history?base=EUR&limit=5')
+
+    data = response.get_json()
+    assert upstream.call_count == 0
+    assert [s['fetched_at'] for s in data['snapshots']] == [3000, 1000]
+    assert data['snapshots'][0]['conversion_rates']['USD'] == pytest.approx(4.0)
+    assert client.get('/rates/history?limit=0').status_code == 400
+
+
+def test_history_endpoint_without_mongo(client):
+    assert client.get('/rates/history').status_code == 503
+
+
+def test_failed_read_makes_archive_unavailable_for_a_while():
+    now = [0.0]
+    archive = RateArchive(mongomock.MongoClient().db.rate_snapshots, retry_interval=60, clock=lambda: now[0])
+    with patch.object(archive.collection, 'find_one', side_effect=RuntimeError('mongod down')):
+        with pytest.raises(RuntimeError):
+            archive.latest('USD')
+
+    assert not archive.available()
+    assert archive.stats()['available'] is False
+    now[0] += 61
+    assert archive.available()
+
+
+def test_refresh_skips_archive_once_a_snapshot_exists(client, monkeypatch, archive, latest_response):
+    import app
+    monkeypatch.setattr(app, 'rate_archive', archive)
+    with patch('requests.Session.get', return_value=latest_response({'USD': 1, 'EUR': 0.5}, time_next_update_unix=time.time() + 3600)):
+        client.get('/rates')
+    # Snapshot expired: the blocking refresh goes straight to the upstream
+    app.rate_snapshot.publish(app.rate_snapshot.current().table, expires_at=time.time() - 1)
+    app.rate_cache.clear()
+
+    with patch.object(archive.collection, 'find_one') as find_one, \
+            patch('requests.Session.get', return_value=latest_response({'USD': 1, 'EUR': 0.6}, time_next_update_unix=time.time() + 3600)) as upstream:
+        response = client.get('/rates')
+
+    find_one.assert_not_called()
+    assert upstream.call_count == 1
+    assert response.get_json()['conversion_rates']['EUR'] == pytest.approx(0.6)
+
+
+def test_cold_miss_skips_failing_archive(client, monkeypatch, archive, latest_response):
+    import app
+    monkeypatch.setattr(app, 'rate_archive', archive)
+    with patch.object(archive.collection, 'find_one', side_effect=RuntimeError('mongod down')) as find_one, \
+            patch('requests.Session.get', return_value=latest_response({'USD': 1, 'EUR': 0.5}, time_next_update_unix=time.time() + 3600)):
+        client.get('/rates')
+        app.rate_cache.clear()
+        app.rate_snapshot.clear()
+        response = client.get('/rates')
+
+    assert response.status_code == 200
+    # Second cold miss: the archive is known down, no second wait on it
+    assert find_one.call_count == 1
@@ -0,0 +1,94 @@
+"""Tests du client amont à connexions persistantes"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from unittest.mock import patch, Mock
+
+from upstream import UpstreamClient, UpstreamError
+
+
+class _RatesHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = json.dumps({'result': 'success', 'path': self.path}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_upstream():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _RatesHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/v6'
+    server.shutdown()
+    server.server_close()
+
+
+def test_connections_are_reused(local_upstream):
+    client = UpstreamClient('key', base_url=local_upstream)
+    for _ in range(5):
+        assert client.latest('USD')['path'] == '/v6/key/latest/USD'
+
+    stats = client.stats()
+    assert stats['requests'] == 5
+    assert stats['connections_opened'] == 1
+    assert stats['connections_reused'] == 4
+
+
+def test_separate_connect_and_read_timeouts():
+    client = UpstreamClient('key', connect_timeout=1.5, read_timeout=7)
+    with patch('requests.Session.get', return_value=Mock()) as get:
+        client.pair('USD', 'EUR', 10.0)
+
+    assert get.call_args.kwargs['timeout'] == (1.5, 7)
+    assert get.call_args.args[0].endswith('/key/pair/USD/EUR/10.0')
+
+
+def test_path_segments_are_url_encoded():
+    client = UpstreamClient('key')
+    with patch('requests.Session.get', return_value=Mock()) as get:
+        client.latest('../x')
+
+    assert get.call_args.args[0].endswith('/latest/..%2Fx')
+
+
+def test_session_rebuilt_after_fork():
+    client = UpstreamClient('key')
+    session = client.session
+    assert client.session is session
+
+    with patch('upstream.os.getpid', return_value=-1):
+        assert client.session is not session
+
+
+def test_error_payloads_and_statuses_raise():
+    client = UpstreamClient('key')
+    quota = Mock(status_code=429)
+    quota.json.return_value = {'result': 'error', 'error-type': 'quota-reached'}
+    with patch('requests.Session.get', return_value=quota):
+        with pytest.raises(UpstreamError) as error:
+            client.latest('USD')
+    assert error.value.error_type == 'quota-reached'
+
+    # Errors in the request itself are returned, they say nothing about the provider
+    unsupported = Mock(status_code=404)
+    unsupported.json.return_value = {'result': 'error', 'error-type': 'unsupported-code'}
+    with patch('requests.Session.get', return_value=unsupported):
+        assert client.pair('USD', 'XXX', 1)['error-type'] == 'unsupported-code'
+
+    outage = Mock()
+    outage.json.side_effect = ValueError('not JSON')
+    outage.raise_for_status.side_effect = requests.HTTPError('503 Server Error')
+    with patch('requests.Session.get', return_value=outage):
+        with pytest.raises(requests.HTTPError):
+            client.latest('USD')
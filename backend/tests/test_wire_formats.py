@@ -0,0 +1,119 @@
+"""Tests des formats binaires (MessagePack, Arrow IPC) et benchmark contre jsonify"""
+import time
+
+import msgpack
+import numpy as np
+import pyarrow as pa
+import pytest
+from unittest.mock import patch
+
+from wire_formats import ARROW, MSGPACK, batch_body, matrix_body, rates_body
+
+
+@pytest.fixture
+def cached_rates(cache_rates):
+    return cache_rates({'USD': 1, 'EUR': 0.5, 'GBP': 0.25, 'JPY': 150.0}, ttl=600)
+
+
+def _arrow(response):
+    return pa.ipc.open_stream(response.get_data()).read_all()
+
+
+def test_rates_msgpack_carries_raw_float64_buffer(client, cached_rates):
+    response = client.get('/rates?base=EUR', headers={'Accept': MSGPACK})
+
+    assert response.mimetype == MSGPACK
+    assert 'Accept' in response.headers['Vary']
+    data = msgpack.unpackb(response.get_data())
+    rates = dict(zip(data['codes'], np.frombuffer(data['rates'], dtype='<f8')))
+    assert rates == pytest.approx(client.get('/rates?base=EUR').get_json()['conversion_rates'])
+    assert response.get_etag() != client.get('/rates?base=EUR').get_etag()
+
+
+def test_rates_arrow_with_symbols(client, cached_rates):
+    response = client.get('/rates?symbols=JPY,EUR', headers={'Accept': ARROW})
+
+    table = _arrow(response)
+    assert table.column('code').to_pylist() == ['EUR', 'JPY']
+    assert table.column('rate').to_pylist() == [0.5, 150.0]
+    assert table.schema.metadata[b'base'] == b'USD'
+
+
+def test_matrix_binary_formats(client, cached_rates):
+    packed = msgpack.unpackb(client.get('/matrix?symbols=USD,EUR', headers={'Accept': MSGPACK}).get_data())
+    grid = np.frombuffer(packed['rows'], dtype='<f8').reshape(2, 2)
+    assert packed['codes'] == ['USD', 'EUR']
+    assert grid.tolist() == [[1.0, 0.5], [2.0, 1.0]]
+
+    table = _arrow(client.get('/matrix', headers={'Accept': ARROW}))
+    assert table.column('base').to_pylist() == ['EUR', 'GBP', 'JPY', 'USD']
+    assert table.column('USD').to_pylist() == [2.0, 4.0, pytest.approx(1 / 150), 1.0]
+
+
+def test_full_binary_bodies_encoded_once_per_table(client, cached_rates):
+    with patch('app.matrix_body', wraps=matrix_body) as encode_matrix, \
+            patch('app.rates_body', wraps=rates_body) as encode_rates:
+        for _ in range(3):
+            for fmt in (MSGPACK, ARROW):
+                client.get('/matrix', headers={'Accept': fmt})
+                client.get('/rates?base=EUR', headers={'Accept': fmt})
+        client.get('/matrix?symbols=USD,EUR', headers={'Accept': MSGPACK})
+
+    # One encoding per format for the full tables; subsets are built per request
+    assert encode_matrix.call_count == 3
+    assert encode_rates.call_count == 2
+
+
+def test_batch_arrow_marks_failed_items_null(client, cached_rates):
+    items = [{'from': 'USD', 'to': 'EUR', 'amount': 10}, {'from': 'USD', 'to': 'CHF', 'amount': 1}]
+    table = _arrow(client.post('/convert/batch', json=items, headers={'Accept': ARROW}))
+
+    assert table.column('converted').to_pylist() == [5.0, None]
+    assert table.column('error').to_pylist() == [None, 'Unsupported currency code.']
+
+
+def test_json_stays_default_for_browsers(client, cached_rates):
+    response = client.get('/rates', headers={'Accept': 'text/html,*/*;q=0.8'})
+    assert response.mimetype == 'application/json'
+
+
+def test_benchmark_binary_against_jsonify(app):
+    """Encode time and size of a 100k-item batch result, binary vs jsonify"""
+    from flask import jsonify
+    n = 100_000
+    rng = np.random.default_rng(0)
+    amounts, rates = rng.uniform(1, 1000, n), rng.uniform(0.01, 200, n)
+    converted = amounts * rates
+    codes = ['USD'] * n
+    errors = [None] * n
+
+    with app.app_context():
+        start = time.perf_counter()
+        json_body = jsonify({'results': [
+            {'status': 'success', 'from': f, 'to': t, 'amount': a, 'rate': r, 'converted': c}
+            for f, t, a, r, c in zip(codes, codes, amounts.tolist(), rates.tolist(), converted.tolist())
+        ]}).get_data()
+        json_time = time.perf_counter() - start
+
+    timings = {}
+    for fmt in (MSGPACK, ARROW):
+        start = time.perf_counter()
+        body = batch_body(fmt, codes, codes, amounts, rates, converted, errors)
+        timings[fmt] = (time.perf_counter() - start, len(body))
+
+    print(f"\njsonify: {json_time * 1000:.1f} ms, {len(json_body)} B")
+    for fmt, (elapsed, size) in timings.items():
+        print(f"{fmt}: {elapsed * 1000:.1f} ms, {size} B")
+        assert size < len(json_body)
+        assert elapsed < json_time
+
+
+def test_batch_binary_formats_mark_overflow_as_error(client, cached_rates):
+    items = [{'from': 'USD', 'to': 'JPY', 'amount': 1e307}, {'from': 'USD', 'to': 'EUR', 'amount': 2}]
+    table = _arrow(client.post('/convert/batch', json=items, headers={'Accept': ARROW}))
+    assert table.column('converted').to_pylist() == [None, 1.0]
+    assert table.column('error').to_pylist() == ['Amount too large.', None]
+
+    body = msgpack.unpackb(client.post('/convert/batch', json=items, headers={'Accept': MSGPACK}).get_data())
+    assert body['errors'] == 1
+    assert np.isnan(np.frombuffer(body['converted'], dtype='<f8')[0])
@@ -0,0 +1,119 @@
+"""Pooled keep-alive client for the exchangerate-api upstream"""
+import os
+import threading
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# ``error-type`` values caused by the request itself, not by the provider
+REQUEST_ERRORS = frozenset({"unsupported-code", "malformed-request"})
+
+
+class UpstreamError(Exception):
+    """The provider answered with an error (quota, key, outage) instead of rates"""
+
+    def __init__(self, error_type, status_code=None):
+        super().__init__(f"Exchange rate provider error: {error_type}.")
+        self.error_type = error_type
+        self.status_code = status_code
+
+
+class UpstreamClient:
+    """Shared ``requests.Session`` for every call to the rate provider.
+
+    Connections are kept alive in a sized ``HTTPAdapter`` pool so successive
+    calls skip the TCP and TLS handshakes. The session is created lazily and
+    re-created after a fork, so each gunicorn worker owns its own pool.
+    Error statuses and ``"result": "error"`` payloads raise (``UpstreamError``
+    for the latter), except for errors in the request itself.
+    """
+
+    def __init__(self, api_key, base_url="https://v6.exchangerate-api.com/v6",
+                 connect_timeout=3.05, read_timeout=5, pool_size=10, breaker=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+        self.breaker = breaker
+        self._session = None
+        self._adapter = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    @property
+    def session(self):
+        """The worker's session, (re)built on first use in each process"""
+        if self._session is None or self._pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    adapter = HTTPAdapter(
+                        pool_connections=1,
+                        pool_maxsize=self.pool_size,
+                        pool_block=False
+                    )
+                    session = requests.Session()
+                    session.headers.update({"Connection": "keep-alive"})
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session, self._adapter, self._pid = session, adapter, os.getpid()
+                    self.requests = 0
+        return self._session
+
+    def get_json(self, path):
+        """GET ``path`` below the keyed API root and decode the JSON body"""
+        if self.breaker is not None:
+            return self.breaker.call(self._get_json, path)
+        return self._get_json(path)
+
+    def _get_json(self, path):
+        response = self.session.get(
+            f"{self.base_url}/{self.api_key}/{path}",
+            timeout=self.timeout
+        )
+        self.requests += 1
+        try:
+            data = response.json()
+        except ValueError:
+            response.raise_for_status()
+            raise
+        # Failures come back as JSON bodies (often with a 4xx/5xx status): raising
+        # here, inside the breaker, counts them as failures
+        if isinstance(data, dict) and data.get("result") == "error":
+            error_type = data.get("error-type") or "unknown-error"
+            if error_type not in REQUEST_ERRORS:
+                raise UpstreamError(error_type, response.status_code)
+            return data
+        response.raise_for_status()
+        return data
+
+    def latest(self, base):
+        """``latest/{base}`` payload: every rate against ``base``"""
+        # URL SAFETY: URL encode the base currency
+        return self.get_json(f"latest/{quote(base, safe='')}")
+
+    def pair(self, from_curr, to_curr, amount):
+        """``pair/{from}/{to}/{amount}`` payload: a single conversion"""
+        # URL SAFETY: URL encode the currencies
+        encoded_from = quote(from_curr, safe='')
+        encoded_to = quote(to_curr, safe='')
+        return self.get_json(f"pair/{encoded_from}/{encoded_to}/{amount}")
+
+    def stats(self):
+        """Connection reuse counters of the current worker's pool"""
+        connections = 0
+        if self._adapter is not None:
+            pools = self._adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+        return {
+            "requests": self.requests,
+            "connections_opened": connections,
+            "connections_reused": max(0, self.requests - connections),
+            "pool_size": self.pool_size,
+            "connect_timeout": self.timeout[0],
+            "read_timeout": self.timeout[1],
+        }
@@ -0,0 +1,110 @@
+"""Binary response bodies (MessagePack, Arrow IPC) built straight from float64 buffers"""
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # optional: MessagePack is then not offered
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional: Arrow IPC is then not offered
+    pa = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+# Formats offered through Accept, JSON first so it stays the default
+FORMATS = (JSON,) + ((MSGPACK,) if msgpack is not None else ()) + ((ARROW,) if pa is not None else ())
+# Short names, e.g. to tell representations apart in an ETag
+FORMAT_TAGS = {JSON: "json", MSGPACK: "msgpack", ARROW: "arrow"}
+
+
+def _float64_bytes(values):
+    """Little-endian float64 bytes of ``values``, a view when already contiguous"""
+    return memoryview(np.ascontiguousarray(values, dtype="<f8")).cast("B")
+
+
+def _arrow_stream(table):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _metadata(**fields):
+    return {key: str(value) for key, value in fields.items()}
+
+
+def rates_body(fmt, base, codes, rates):
+    """``/rates`` body: ``codes`` and their float64 ``rates`` against ``base``.
+
+    MessagePack: ``{"status", "base", "codes": [...], "rates": bin}`` where
+    ``rates`` is the raw little-endian float64 buffer (``np.frombuffer``).
+    Arrow: one record batch with ``code`` and ``rate`` columns, ``base`` in
+    the schema metadata.
+    """
+    if fmt == MSGPACK:
+        return msgpack.packb({
+            "status": "success",
+            "base": base,
+            "codes": list(codes),
+            "rates": _float64_bytes(rates),
+        })
+    table = pa.table(
+        {"code": pa.array(codes, pa.string()), "rate": pa.array(np.asarray(rates, dtype=np.float64))},
+        metadata=_metadata(status="success", base=base),
+    )
+    return _arrow_stream(table)
+
+
+def matrix_body(fmt, codes, grid):
+    """``/matrix`` body for an N x N ``grid`` whose rows and columns follow ``codes``.
+
+    MessagePack: ``{"status", "codes", "rows": bin}`` with the grid as one
+    row-major float64 buffer. Arrow: a ``base`` column plus one float64
+    column per target currency.
+    """
+    if fmt == MSGPACK:
+        return msgpack.packb({"status": "success", "codes": list(codes), "rows": _float64_bytes(grid)})
+    columns = np.ascontiguousarray(np.asarray(grid, dtype=np.float64).T)
+    data = {"base": pa.array(codes, pa.string())}
+    for code, column in zip(codes, columns):
+        data[code] = pa.array(column)
+    return _arrow_stream(pa.table(data, metadata=_metadata(status="success")))
+
+
+def batch_body(fmt, from_codes, to_codes, amounts, rates, converted, errors):
+    """``/convert/batch`` results as columns, NaN / error message where an item failed.
+
+    MessagePack: ``{"status", "count", "errors", "from", "to", "error",
+    "amount": bin, "rate": bin, "converted": bin}``. Arrow: the same
+    columns, with nulls instead of NaN for failed items.
+    """
+    error_count = sum(1 for error in errors if error is not None)
+    if fmt == MSGPACK:
+        return msgpack.packb({
+            "status": "success",
+            "count": len(errors),
+            "errors": error_count,
+            "from": list(from_codes),
+            "to": list(to_codes),
+            "error": list(errors),
+            "amount": _float64_bytes(amounts),
+            "rate": _float64_bytes(rates),
+            "converted": _float64_bytes(converted),
+        })
+    failed = np.array([error is not None for error in errors], dtype=bool)
+    table = pa.table(
+        {
+            "from": pa.array(from_codes, pa.string()),
+            "to": pa.array(to_codes, pa.string()),
+            "amount": pa.array(np.asarray(amounts, dtype=np.float64), mask=failed),
+            "rate": pa.array(np.asarray(rates, dtype=np.float64), mask=failed),
+            "converted": pa.array(np.asarray(converted, dtype=np.float64), mask=failed),
+            "error": pa.array(errors, pa.string()),
+        },
+        metadata=_metadata(status="success", count=len(errors), errors=error_count),
+    )
+    return _arrow_stream(table)